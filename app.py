@@ -1,25 +1,52 @@
 import streamlit as st
 from services.storage_service import StorageService
 from services.pipeline_service import PipelineService
+from services.export_job import ExportSlot
 from services.graph_service import GraphService
+from services.mutation_journal import MutationJournal
+from services.shared_workspace import SharedWorkspaceStore
+from services.upload_cache import UploadCache
 from utils.visualization import GraphVisualizer, CircleVisualizer, PipelineVisualizer
 from ui.components import Sidebar
 from ui.entry_manager import EntryManager
 
+# Storage format label -> (format, path on the server)
+STORAGE_FORMATS = {
+    "Excel": ('excel', 'decision_pipeline.xlsx'),
+    "Parquet": ('parquet', 'decision_pipeline_parquet'),
+    "Feather": ('feather', 'decision_pipeline_feather')
+}
+
+# Where edits are journaled so a refresh or restart does not lose them
+JOURNAL_DIRECTORY = 'decision_pipeline_journal'
+
+@st.cache_resource
+def get_shared_workspace():
+    """The workspace shared by every session in this process.
+
+    Built once: the tables are rebuilt from the last checkpoint and journal,
+    and the store, journal, PipelineService (with its indexes),
+    GraphService (with its graph cache) and the export slot are then reused
+    by all sessions and reruns.
+    """
+    store = SharedWorkspaceStore()
+    journal = MutationJournal(JOURNAL_DIRECTORY)
+    journal.recover(store)
+    StorageService().initialize_dataframes(store)
+    pipeline_service = PipelineService(store, journal)
+    return store, pipeline_service, GraphService(pipeline_service), ExportSlot()
+
 def initialize_services():
     """Initialize all services needed for the application"""
-    storage_service = StorageService()
-    storage_service.initialize_dataframes(st)
-    
-    pipeline_service = PipelineService(st)
-    graph_service = GraphService(pipeline_service)
+    store, pipeline_service, graph_service, export_slot = get_shared_workspace()
     graph_visualizer = GraphVisualizer()
     circle_visualizer = CircleVisualizer()
     
-    return pipeline_service, graph_service, graph_visualizer, circle_visualizer
+    return store, pipeline_service, graph_service, export_slot, graph_visualizer, circle_visualizer
 
 def render_main_content(pipeline_service, graph_service, graph_visualizer, circle_visualizer):
     """Render the main content area of the application"""
+    store = pipeline_service.store
     st.title("Decision Pipeline")
     
     # Add tabs for all visualizations and management
@@ -33,11 +60,12 @@ def render_main_content(pipeline_service, graph_service, graph_visualizer, circl
     # Pipeline Visualization Tab
     with viz_tab:
         # Add decision selector
-        if 'decisions_df' in st.session_state and not st.session_state.decisions_df.empty:
-            decisions = st.session_state.decisions_df['decision'].tolist()
+        decisions = pipeline_service.get_names('decisions_df')
+        if decisions:
             selected_decision = st.selectbox(
                 "Select a decision to visualize",
-                options=decisions
+                options=list(decisions),
+                format_func=decisions.get
             )
             pipeline_viz = PipelineVisualizer(pipeline_service, graph_service)
             pipeline_viz.render(selected_decision)
@@ -68,10 +96,10 @@ def render_main_content(pipeline_service, graph_service, graph_visualizer, circl
         if hasattr(st.session_state, 'selected_view') and st.session_state.selected_view is not None:
             df_name, item_key = st.session_state.selected_view
             
-            if df_name in st.session_state and not st.session_state[df_name].empty:
+            if df_name in store and not store.get(df_name).empty:
                 items_data = [
                     {item_key: row[item_key], 'urgency': row['urgency']}
-                    for _, row in st.session_state[df_name].iterrows()
+                    for _, row in store.get(df_name).iterrows()
                 ]
                 if items_data:
                     svg_content = circle_visualizer.create_circle_graph(items_data, item_key)
@@ -87,10 +115,11 @@ def render_main_content(pipeline_service, graph_service, graph_visualizer, circl
         st.header("Todo List")
         
         # Add category filter controls
-        if 'todos_df' in st.session_state and not st.session_state.todos_df.empty:
+        todos_df = store.get('todos_df') if 'todos_df' in store else None
+        if todos_df is not None and not todos_df.empty:
             # Get all unique categories from todos
             all_categories = set()
-            for categories in st.session_state.todos_df['categories']:
+            for categories in todos_df['categories']:
                 all_categories.update(categories)
             
             # Create category filter
@@ -102,13 +131,13 @@ def render_main_content(pipeline_service, graph_service, graph_visualizer, circl
             
             # Filter todos based on selected categories
             if selected_categories:
-                filtered_todos = st.session_state.todos_df[
-                    st.session_state.todos_df['categories'].apply(
+                filtered_todos = todos_df[
+                    todos_df['categories'].apply(
                         lambda x: any(cat in x for cat in selected_categories)
                     )
                 ]
             else:
-                filtered_todos = st.session_state.todos_df
+                filtered_todos = todos_df
             
             # Sort filtered todos by importance
             filtered_todos = filtered_todos.sort_values('importance', ascending=False)
@@ -121,12 +150,12 @@ def render_main_content(pipeline_service, graph_service, graph_visualizer, circl
                         st.write(f"Categories: {', '.join(todo['categories'])}")
                         col1, col2 = st.columns(2)
                         with col1:
-                            if st.button("Edit", key=f"edit_{todo['title']}"):
-                                st.session_state.selected_todo = todo['title']
+                            if st.button("Edit", key=f"edit_{todo['id']}"):
+                                st.session_state.selected_todo = todo['id']
                                 st.rerun()
                         with col2:
-                            if st.button("Delete", key=f"delete_{todo['title']}"):
-                                if pipeline_service.delete_todo(todo['title']):
+                            if st.button("Delete", key=f"delete_{todo['id']}"):
+                                if pipeline_service.delete_todo(todo['id']):
                                     st.success(f"Deleted todo '{todo['title']}'")
                                     st.rerun()
             else:
@@ -139,7 +168,12 @@ def render_main_content(pipeline_service, graph_service, graph_visualizer, circl
         entry_manager = EntryManager(pipeline_service)
         entry_manager.render()
 
-def add_file_management(storage_service):
+@st.cache_resource
+def get_upload_cache():
+    """Process-wide cache of parsed uploads, shared by all sessions"""
+    return UploadCache()
+
+def add_file_management(storage_service, store, journal, export_slot):
     """Add file upload and download functionality"""
     st.sidebar.header("File Management")
     
@@ -150,19 +184,99 @@ def add_file_management(storage_service):
         help="Upload an existing decision pipeline Excel file"
     )
     if uploaded_file is not None:
-        try:
-            storage_service.load_from_excel(st, uploaded_file)
+        # Only load a given upload once; later reruns keep the in-session edits
+        if st.session_state.get('loaded_upload_id') != uploaded_file.file_id:
+            try:
+                upload_cache = get_upload_cache()
+                fingerprint = upload_cache.fingerprint(uploaded_file.getvalue())
+                frames = upload_cache.get(fingerprint)
+                if frames is None:
+                    progress_bar = st.sidebar.progress(0.0, text="Reading workbook...")
+                    frames = storage_service.read_excel_frames(
+                        uploaded_file,
+                        progress=lambda fraction, message: progress_bar.progress(fraction, text=message)
+                    )
+                    progress_bar.empty()
+                    upload_cache.put(fingerprint, frames)
+                storage_service.load_frames(store, frames)
+                journal.checkpoint(store)
+                st.session_state.loaded_upload_id = uploaded_file.file_id
+            except Exception as e:
+                st.sidebar.error(f"Error loading file: {str(e)}")
+        if st.session_state.get('loaded_upload_id') == uploaded_file.file_id:
             st.sidebar.success("Pipeline data loaded successfully!")
-        except Exception as e:
-            st.sidebar.error(f"Error loading file: {str(e)}")
     
-    # File download
+    # Storage format for saving and loading on the server
+    storage_format = st.sidebar.radio(
+        "Storage Format",
+        list(STORAGE_FORMATS),
+        help="Excel for sharing; Parquet/Feather for fast routine saves of large workspaces"
+    )
+    file_format, path = STORAGE_FORMATS[storage_format]
+
+    # File download, written in the background so the UI stays responsive
     if st.sidebar.button("Download Pipeline Data"):
+        # One export per process: the slot is shared by every session
+        job = export_slot.start(storage_service, store, file_format, path)
+        if job is None:
+            st.sidebar.info(f"An export to '{export_slot.job.path}' is already running.")
+        else:
+            st.session_state.export_job = job
+    with st.sidebar:
+        show_export_status(store, export_slot)
+
+    if st.sidebar.button("Load Saved Pipeline Data"):
         try:
-            storage_service.save_to_excel(st)
-            st.sidebar.success("Pipeline data saved to 'decision_pipeline.xlsx'!")
+            if file_format == 'excel':
+                progress_bar = st.sidebar.progress(0.0, text="Reading workbook...")
+                storage_service.load_from_excel(
+                    store, path,
+                    progress=lambda fraction, message: progress_bar.progress(fraction, text=message)
+                )
+                progress_bar.empty()
+            else:
+                storage_service.load_from_columnar(store, path, file_format)
+            journal.checkpoint(store)
+            st.sidebar.success(f"Pipeline data loaded from '{path}'!")
         except Exception as e:
-            st.sidebar.error(f"Error saving file: {str(e)}")
+            st.sidebar.error(f"Error loading file: {str(e)}")
+
+    unsaved = store.unsaved_changes()
+    st.sidebar.caption(f"{unsaved} unsaved change{'s' if unsaved != 1 else ''}")
+    if journal.error is not None:
+        st.sidebar.warning(f"Edits may not survive a restart: {str(journal.error)}")
+
+def show_export_status(store, export_slot):
+    """Show the running export's progress, polling until it finishes, then its outcome"""
+    result = st.session_state.pop('export_result', None)
+    if result is not None:
+        level, message = result
+        getattr(st, level)(message)
+
+    job = st.session_state.get('export_job')
+    if job is not None:
+        # Only poll (rerun this part of the page) while an export is in flight
+        st.fragment(run_every=0.5)(poll_export)(store, export_slot)
+
+def poll_export(store, export_slot):
+    job = st.session_state.get('export_job')
+    if job is None:
+        return
+    if not job.done():
+        fraction, message = job.progress
+        st.progress(fraction, text=message)
+        return
+
+    export_slot.release(job, store)
+    del st.session_state['export_job']
+    if job.error is not None:
+        st.session_state.export_result = ('error', f"Error saving file: {str(job.error)}")
+    elif job.written:
+        st.session_state.export_result = ('success', f"Pipeline data saved to '{job.path}'!")
+    else:
+        st.session_state.export_result = ('info', f"No unsaved changes; '{job.path}' is up to date.")
+    # Full rerun so the outcome and the unsaved changes count are shown
+    st.rerun()
 
 def main():
     # Set page config
@@ -173,13 +287,13 @@ def main():
     )
     
     # Initialize all services
-    pipeline_service, graph_service, graph_visualizer, circle_visualizer = initialize_services()
+    store, pipeline_service, graph_service, export_slot, graph_visualizer, circle_visualizer = initialize_services()
     storage_service = StorageService()
     
     # Render sidebar with entry addition and file management
     sidebar = Sidebar(pipeline_service)
     sidebar.render()
-    add_file_management(storage_service)
+    add_file_management(storage_service, store, pipeline_service.journal, export_slot)
     
     # Render main content
     render_main_content(pipeline_service, graph_service, graph_visualizer, circle_visualizer)
@@ -1,31 +1,152 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
+# The services share tables by shallow copy (copy(deep=False)) and never
+# modify a stored DataFrame in place: a change is made on a shallow copy that
+# then replaces it. With copy-on-write the copy's first write copies the data
+# it touches, so readers, export snapshots and journal checkpoints holding the
+# previous frame never see it change. Copy-on-write is always on from pandas 3
+# and has to be turned on before that.
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.options.mode.copy_on_write = True
+
 class DataFrameModel:
+    # Every table has an int64 'id' column, and rows are labelled by that id.
+    # Relationships are stored as integer foreign keys rather than entity text.
+    ID_COLUMNS = ['id', 'concern_id', 'decision_id', 'goal_id']
+
+    # Id used for a foreign key whose parent could not be found
+    MISSING_ID = -1
+
+    # Compact dtypes for non-id columns; anything not listed (entity text,
+    # rationale, details, list columns) stays object. Urgency and importance
+    # are 1-100 sliders, and status/assignee repeat a few values on many rows.
+    SCHEMA = {
+        'urgency': 'int8',
+        'importance': 'int8',
+        'date_added': 'datetime64[us]',
+        'status': 'category',
+        'assignee': 'category'
+    }
+
+    # Free-text columns, plus the text behind the status/assignee categories
+    TEXT_COLUMNS = ['concern', 'question', 'decision', 'rationale', 'goal', 'task',
+                    'assignee', 'status', 'title', 'details']
+
+    # Urgency and importance are whole numbers in SCORE_RANGE. A blank score
+    # (e.g. an empty cell in an older workbook) gets the sliders' default.
+    SCORE_COLUMNS = ('urgency', 'importance')
+    SCORE_RANGE = (1, 100)
+    SCORE_DEFAULT = 50
+
     @staticmethod
     def create_concerns_df():
-        return pd.DataFrame(columns=['concern', 'urgency', 'date_added'])
-    
+        return DataFrameModel._create_df(['id', 'concern', 'urgency', 'date_added'])
+
     @staticmethod
     def create_questions_df():
-        return pd.DataFrame(columns=['question', 'related_concern', 'urgency', 'date_added'])
-    
+        return DataFrameModel._create_df(['id', 'question', 'concern_id', 'urgency', 'date_added'])
+
     @staticmethod
     def create_decisions_df():
-        # Changed related_question to related_questions to indicate it stores a list
-        return pd.DataFrame(columns=['decision', 'rationale', 'related_questions', 'urgency', 'date_added'])
-    
+        # question_ids stores a list of question ids
+        return DataFrameModel._create_df(['id', 'decision', 'rationale', 'question_ids', 'urgency', 'date_added'])
+
     @staticmethod
     def create_goals_df():
-        return pd.DataFrame(columns=['goal', 'related_decision', 'urgency', 'date_added'])
-    
+        return DataFrameModel._create_df(['id', 'goal', 'decision_id', 'urgency', 'date_added'])
+
     @staticmethod
     def create_tasks_df():
-        return pd.DataFrame(columns=['task', 'assignee', 'related_goal', 'status', 'urgency', 'date_added'])
-    
+        return DataFrameModel._create_df(['id', 'task', 'assignee', 'goal_id', 'status', 'urgency', 'date_added'])
+
     @staticmethod
     def create_todos_df():
-        return pd.DataFrame(columns=['title', 'details', 'categories', 'importance', 'date_added'])
+        return DataFrameModel._create_df(['id', 'title', 'details', 'categories', 'importance', 'date_added'])
+
+    @staticmethod
+    def enforce_schema(df):
+        """Cast df's id and SCHEMA columns to their dtypes in place and return it"""
+        for column in df.columns:
+            dtype = DataFrameModel._dtype(column)
+            if dtype == 'object' or df[column].dtype == dtype:
+                continue
+            if dtype == 'datetime64[us]':
+                df[column] = pd.to_datetime(df[column]).astype(dtype)
+            elif dtype == 'category':
+                df[column] = df[column].astype(dtype)
+            elif column in DataFrameModel.SCORE_COLUMNS:
+                df[column] = DataFrameModel._cast_scores(df[column], dtype)
+            else:
+                df[column] = df[column].astype(dtype)
+        return df
+
+    @staticmethod
+    def concat(df, rows):
+        """Append rows to df without widening its dtypes.
+
+        rows are cast to the schema and categorical columns get the union of
+        both sides' categories, since concatenating categoricals with
+        different categories would fall back to object.
+        """
+        rows = DataFrameModel.enforce_schema(rows)
+        for column in df.columns:
+            if isinstance(df[column].dtype, pd.CategoricalDtype) and column in rows:
+                if df[column].dtype == rows[column].dtype:
+                    continue
+                categories = df[column].cat.categories.union(rows[column].cat.categories, sort=False)
+                dtype = pd.CategoricalDtype(categories)
+                df = df.assign(**{column: df[column].astype(dtype)})
+                rows[column] = rows[column].astype(dtype)
+        return pd.concat([df, rows])
+
+    @staticmethod
+    def set_value(df, row_id, column, value):
+        """Set one cell in place, adding value as a category first where needed"""
+        series = df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            if value not in series.cat.categories:
+                df[column] = series.cat.add_categories([value])
+        elif column in DataFrameModel.SCORE_COLUMNS:
+            value = int(DataFrameModel._cast_scores(pd.Series([value], name=column), 'int64').iloc[0])
+        # .at stores list values (question_ids, categories) as a single cell
+        df.at[row_id, column] = value
+
+    @staticmethod
+    def _dtype(column):
+        if column in DataFrameModel.ID_COLUMNS:
+            return 'int64'
+        return DataFrameModel.SCHEMA.get(column, 'object')
+
+    @staticmethod
+    def to_scores(series):
+        """Scores as numbers, NaN where missing, boolean, fractional or outside SCORE_RANGE"""
+        if series.dtype == bool or series.dtype == object:
+            series = series.mask(series.map(lambda value: isinstance(value, (bool, np.bool_))))
+        numbers = pd.to_numeric(series, errors='coerce')
+        low, high = DataFrameModel.SCORE_RANGE
+        return numbers.where(numbers.between(low, high) & (numbers % 1 == 0))
+
+    @staticmethod
+    def _cast_scores(series, dtype):
+        """Cast scores to dtype, filling blanks with SCORE_DEFAULT and raising on invalid values"""
+        scores = DataFrameModel.to_scores(series)
+        invalid = scores.isna() & series.notna()
+        if invalid.any():
+            low, high = DataFrameModel.SCORE_RANGE
+            raise ValueError(
+                f"{series.name or 'value'} must be a whole number between {low} and {high}, "
+                f"not {series[invalid].tolist()[0]!r}"
+            )
+        return scores.fillna(DataFrameModel.SCORE_DEFAULT).astype(dtype)
+
+    @staticmethod
+    def _create_df(columns):
+        return pd.DataFrame({
+            column: pd.Series(dtype=DataFrameModel._dtype(column))
+            for column in columns
+        })
 
 class PipelineItem:
     def __init__(self, data):
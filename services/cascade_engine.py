@@ -0,0 +1,36 @@
+class CascadeEngine:
+    """Compute everything a delete removes along concern -> question -> decision -> goal -> task.
+
+    The closure is computed once, level by level, using the parent -> child
+    indexes (including the inverted question -> decisions index), so
+    PipelineService can drop every affected row with a single mask per table
+    instead of recursing item by item.
+    """
+
+    CASCADE_ORDER = ['concerns_df', 'questions_df', 'decisions_df', 'goals_df', 'tasks_df']
+
+    def __init__(self, index):
+        self.index = index
+
+    def closure(self, table, ids):
+        """Return {table: [ids]} for the given rows and all their descendants"""
+        affected = {name: set() for name in self.CASCADE_ORDER}
+        affected[table].update(ids)
+
+        for concern_id in affected['concerns_df']:
+            affected['questions_df'].update(self.index.child_rows('questions_df', concern_id))
+
+        for question_id in affected['questions_df']:
+            affected['decisions_df'].update(self.index.child_rows('decisions_df', question_id))
+
+        for decision_id in affected['decisions_df']:
+            affected['goals_df'].update(self.index.child_rows('goals_df', decision_id))
+
+        for goal_id in affected['goals_df']:
+            affected['tasks_df'].update(self.index.child_rows('tasks_df', goal_id))
+
+        return {name: sorted(ids) for name, ids in affected.items() if ids}
+
+    def counts(self, table, ids):
+        """Dry run: return {table: number of rows a delete would remove}"""
+        return {name: len(ids) for name, ids in self.closure(table, ids).items()}
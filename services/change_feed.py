@@ -0,0 +1,78 @@
+import threading
+from collections import deque, namedtuple
+
+# key is a row id, or None when the whole table changed (op 'replace' or 'reorder')
+ChangeEvent = namedtuple('ChangeEvent', ['version', 'table', 'key', 'op'])
+
+class ChangeFeed:
+    """Workspace version counter plus a bounded stream of change events.
+
+    Every mutation of the workspace emits one new version with an event per
+    affected row, e.g. (7, 'goals_df', 12, 'delete'). Consumers that cached
+    something at version v call since(v) to learn exactly what changed, or
+    subscribe() to be told as it happens. Only the newest max_events events
+    are kept; since() returns None when a consumer has fallen further behind,
+    meaning it must recompute everything.
+
+    Operations: 'add', 'update' and 'delete' for rows, 'reorder' when a
+    table was re-sorted and 'replace' when a table was swapped wholesale
+    (created, loaded or recovered).
+    """
+
+    OPERATIONS = ('add', 'update', 'delete', 'reorder', 'replace')
+
+    def __init__(self, max_events=10000):
+        self.version = 0
+        self.max_events = max_events
+        self._events = deque()
+        # since(v) is only complete for v >= this version
+        self._dropped_through = 0
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def emit(self, table, keys, op):
+        """Record op on the rows keys of table (None for the whole table) as one new version"""
+        if op not in self.OPERATIONS:
+            raise ValueError(f"Unknown change operation: {op}")
+        with self._lock:
+            self.version += 1
+            if keys is None:
+                events = [ChangeEvent(self.version, table, None, op)]
+            else:
+                events = [ChangeEvent(self.version, table, key, op) for key in keys]
+            self._events.extend(events)
+            while len(self._events) > self.max_events:
+                self._dropped_through = self._events.popleft().version
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(events)
+        return self.version
+
+    def since(self, version):
+        """Return the events after version, oldest first, or None if some were already dropped"""
+        with self._lock:
+            if version < self._dropped_through:
+                return None
+            if version >= self.version:
+                return []
+            # Events are in version order, so walk back from the newest
+            events = []
+            for event in reversed(self._events):
+                if event.version <= version:
+                    break
+                events.append(event)
+            return events[::-1]
+
+    def changed_tables(self, version):
+        """Return the set of tables changed after version, or None if unknown"""
+        events = self.since(version)
+        return None if events is None else {event.table for event in events}
+
+    def subscribe(self, listener):
+        """Call listener(events) after every emit, from the thread that made the change"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        with self._lock:
+            self._listeners.remove(listener)
@@ -0,0 +1,194 @@
+from itertools import chain
+import numpy as np
+from services.pipeline_index import PipelineIndex
+
+class CSRGraph:
+    """Array-backed snapshot of the workspace graph for large-scale analytics.
+
+    Nodes are the rows of the five pipeline tables, numbered 0..n-1 with each
+    type in one contiguous block sorted by row id; kinds holds the position of
+    a node's type in KINDS (int8) and ids its row id. Edges run
+    concern -> question -> decision -> goal -> task as in the portfolio graph,
+    stored as CSR arrays: the children of node v are
+    indices[indptr[v]:indptr[v + 1]], and rev_indptr/rev_indices hold the
+    parents the same way. That is a few bytes per edge instead of
+    NetworkX's dicts, and every operation below is a handful of NumPy calls
+    rather than a Python loop over nodes.
+
+    A CSRGraph is immutable; GraphService.csr_graph() rebuilds it when the
+    workspace changed.
+    """
+
+    # Table -> node type, in edge order
+    NODE_TABLES = {
+        'concerns_df': 'concern',
+        'questions_df': 'question',
+        'decisions_df': 'decision',
+        'goals_df': 'goal',
+        'tasks_df': 'task'
+    }
+    KINDS = tuple(NODE_TABLES.values())
+
+    def __init__(self, kinds, ids, sources, targets):
+        self.kinds = kinds
+        self.ids = ids
+        self.indptr, self.indices = self._csr(len(kinds), sources, targets)
+        self.rev_indptr, self.rev_indices = self._csr(len(kinds), targets, sources)
+        # Start of each kind's block, plus the end
+        self.offsets = np.searchsorted(kinds, np.arange(len(self.KINDS) + 1)).astype(np.int64)
+
+    @classmethod
+    def from_store(cls, store):
+        """Build from the tables in store; hold store.reading() for a consistent snapshot"""
+        frames = [store.get(table) for table in cls.NODE_TABLES]
+        blocks = [np.sort(df.index.to_numpy(dtype=np.int64)) for df in frames]
+        kinds = np.repeat(np.arange(len(blocks), dtype=np.int8), [len(block) for block in blocks])
+        ids = np.concatenate(blocks)
+        offsets = np.concatenate([[0], np.cumsum([len(block) for block in blocks])])
+
+        sources, targets = [], []
+        for kind, (table, df) in enumerate(zip(cls.NODE_TABLES, frames)):
+            if kind == 0:
+                continue
+            column = PipelineIndex.PARENT_COLUMNS[table]
+            child_ids = df.index.to_numpy(dtype=np.int64)
+            if column in PipelineIndex.LIST_COLUMNS:
+                parent_lists = [
+                    value if isinstance(value, list) else [] for value in df[column].tolist()
+                ]
+                child_ids = np.repeat(child_ids, [len(value) for value in parent_lists])
+                parent_ids = np.fromiter(chain.from_iterable(parent_lists), dtype=np.int64, count=len(child_ids))
+            else:
+                parent_ids = df[column].to_numpy(dtype=np.int64)
+            parents = cls._positions(blocks[kind - 1], parent_ids)
+            # Skip references to missing parents, as the portfolio graph does
+            found = parents >= 0
+            sources.append(parents[found] + offsets[kind - 1])
+            targets.append(cls._positions(blocks[kind], child_ids[found]) + offsets[kind])
+
+        sources = np.concatenate(sources) if sources else np.empty(0, dtype=np.int64)
+        targets = np.concatenate(targets) if targets else np.empty(0, dtype=np.int64)
+        return cls(kinds, ids, sources, targets)
+
+    @property
+    def num_nodes(self):
+        return len(self.kinds)
+
+    @property
+    def num_edges(self):
+        return len(self.indices)
+
+    def nodes(self, node_type, row_ids):
+        """Node indices for row ids of node_type, -1 where a row does not exist"""
+        kind = self.KINDS.index(node_type)
+        start, end = self.offsets[kind], self.offsets[kind + 1]
+        positions = self._positions(self.ids[start:end], np.asarray(row_ids, dtype=np.int64))
+        return np.where(positions >= 0, positions + start, -1)
+
+    def out_degree(self):
+        return np.diff(self.indptr)
+
+    def in_degree(self):
+        return np.diff(self.rev_indptr)
+
+    def degree(self):
+        return self.out_degree() + self.in_degree()
+
+    def fan_out(self, node_type, child_type=None):
+        """Children per node of node_type, as (row ids, counts).
+
+        With child_type, count the descendants of that type instead, e.g.
+        fan_out('concern', 'task') for the tasks under each concern. A task
+        reachable along two paths (a decision answering two questions of the
+        same concern) is counted once per path.
+        """
+        kind = self.KINDS.index(node_type)
+        start, end = self.offsets[kind], self.offsets[kind + 1]
+        if child_type is None:
+            return self.ids[start:end], self.out_degree()[start:end]
+        target = self.KINDS.index(child_type)
+        if target <= kind:
+            raise ValueError(f"{child_type} is not downstream of {node_type}")
+
+        # Each kind's children are all of the next kind, so propagate the
+        # counts one block at a time from child_type back up to node_type
+        counts = np.zeros(self.num_nodes, dtype=np.int64)
+        counts[self.offsets[target]:self.offsets[target + 1]] = 1
+        for level in range(target - 1, kind - 1, -1):
+            lo, hi = self.offsets[level], self.offsets[level + 1]
+            parents = np.repeat(np.arange(hi - lo), np.diff(self.indptr[lo:hi + 1]))
+            children = self.indices[self.indptr[lo]:self.indptr[hi]]
+            counts[lo:hi] = np.bincount(parents, weights=counts[children], minlength=hi - lo)
+        return self.ids[start:end], counts[start:end]
+
+    def depth(self):
+        """Length of the longest path from a root (a node without parents) to each node"""
+        depth = np.zeros(self.num_nodes, dtype=np.int64)
+        sources = np.repeat(np.arange(self.num_nodes), self.out_degree())
+        # Paths have at most one edge per kind
+        for _ in range(len(self.KINDS) - 1):
+            updated = depth.copy()
+            np.maximum.at(updated, self.indices, depth[sources] + 1)
+            if np.array_equal(updated, depth):
+                break
+            depth = updated
+        return depth
+
+    def bfs(self, sources, reverse=False):
+        """Hop distance from the nearest of the source nodes, -1 if unreachable.
+
+        Follows parent edges instead of child edges when reverse is True. Each
+        step expands the whole frontier at once.
+        """
+        indptr, indices = (self.rev_indptr, self.rev_indices) if reverse else (self.indptr, self.indices)
+        distance = np.full(self.num_nodes, -1, dtype=np.int64)
+        frontier = np.unique(np.asarray(sources, dtype=np.int64))
+        distance[frontier] = 0
+        step = 0
+        while len(frontier):
+            step += 1
+            neighbours = indices[self._edge_positions(indptr, frontier)]
+            frontier = np.unique(neighbours[distance[neighbours] < 0])
+            distance[frontier] = step
+        return distance
+
+    def reachable(self, node_type, row_id, reverse=False):
+        """{node type: row ids} reachable from an item (or reaching it, if reverse)"""
+        node = self.nodes(node_type, [row_id])[0]
+        if node < 0:
+            return None
+        distance = self.bfs([node], reverse=reverse)
+        distance[node] = -1
+        reached = np.flatnonzero(distance >= 0)
+        kinds = self.kinds[reached]
+        return {
+            self.KINDS[kind]: self.ids[reached[kinds == kind]]
+            for kind in np.unique(kinds).tolist()
+        }
+
+    @staticmethod
+    def _csr(n, sources, targets):
+        order = np.argsort(sources, kind='stable')
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=n), out=indptr[1:])
+        return indptr, targets[order].astype(np.int32)
+
+    @staticmethod
+    def _edge_positions(indptr, nodes):
+        """Positions in indices of every edge leaving nodes"""
+        starts = indptr[nodes]
+        counts = indptr[nodes + 1] - starts
+        total = counts.sum()
+        if not total:
+            return np.empty(0, dtype=np.int64)
+        # Offset of each edge within its node's run, plus that run's start
+        run_starts = np.repeat(np.cumsum(counts) - counts, counts)
+        return np.repeat(starts, counts) + np.arange(total) - run_starts
+
+    @staticmethod
+    def _positions(sorted_ids, row_ids):
+        """Position of each of row_ids in sorted_ids, -1 where absent"""
+        if not len(sorted_ids):
+            return np.full(len(row_ids), -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(sorted_ids, row_ids), len(sorted_ids) - 1)
+        return np.where(sorted_ids[positions] == row_ids, positions, -1)
@@ -0,0 +1,80 @@
+import threading
+
+class ExportJob:
+    """Save a snapshot of the workspace on a background thread.
+
+    The tables are shallow-copied when the job starts (see
+    WorkspaceStore.snapshot), so the Streamlit script run is not
+    blocked by the write and can keep editing the live workspace. The job's
+    progress, result and error are read by the UI while it polls.
+    """
+
+    def __init__(self, storage_service, store, file_format, path):
+        self.storage_service = storage_service
+        self.file_format = file_format
+        self.path = path
+        self.snapshot = store.snapshot(storage_service.TABLE_NAMES)
+        self.progress = (0.0, "Starting export...")
+        self.written = None
+        self.error = None
+        self._thread = threading.Thread(target=self._run, name='pipeline-export', daemon=True)
+        self._thread.start()
+
+    def done(self):
+        """True once the export has finished, successfully or not"""
+        return not self._thread.is_alive()
+
+    def finish(self, store):
+        """Hand the snapshot's change tracking back to store once the job is done.
+
+        After a successful save only edits made during the export remain
+        unsaved; after a failure the snapshot's changes are unsaved again.
+        """
+        store.merge_changes(self.snapshot)
+
+    def _run(self):
+        try:
+            if self.file_format == 'excel':
+                self.written = self.storage_service.save_to_excel(
+                    self.snapshot, self.path, progress=self._report
+                )
+            else:
+                self.written = self.storage_service.save_to_columnar(
+                    self.snapshot, self.path, self.file_format, progress=self._report
+                )
+        except Exception as e:
+            self.error = e
+
+    def _report(self, fraction, message):
+        self.progress = (fraction, message)
+
+
+class ExportSlot:
+    """The one export allowed to run at a time in a process.
+
+    Lives with the shared workspace (not in a session), so two sessions
+    cannot write the same server file concurrently. A finished job is handed
+    back to the store exactly once: by release() from the session polling
+    it, or by the next start() if that session went away.
+    """
+
+    def __init__(self):
+        self.job = None
+        self._lock = threading.Lock()
+
+    def start(self, storage_service, store, file_format, path):
+        """Start an export and return it, or return None if one is still running"""
+        with self._lock:
+            if self.job is not None:
+                if not self.job.done():
+                    return None
+                self.job.finish(store)
+            self.job = ExportJob(storage_service, store, file_format, path)
+            return self.job
+
+    def release(self, job, store):
+        """Hand a finished job's changes back to store if it still holds the slot"""
+        with self._lock:
+            if self.job is job:
+                job.finish(store)
+                self.job = None
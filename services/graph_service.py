@@ -1,63 +1,203 @@
-import networkx as nx
+from collections import OrderedDict
+import threading
+import numpy as np
+from services.csr_graph import CSRGraph
+from services.portfolio_graph import PortfolioGraph
+from services.reachability_index import ReachabilityIndex
 
 class GraphService:
-    def __init__(self, pipeline_service):
+    """NetworkX graphs of the workspace and of single decisions.
+
+    A PortfolioGraph holds the whole workspace with globally unique node ids
+    and is updated incrementally; a decision's graph is a read-only subgraph
+    view of it (its questions, their concerns, its goals and their tasks).
+
+    Views are kept in an LRU cache together with the workspace version
+    (store.changes) they are known to be valid at and the ids of every row
+    they were built from. On lookup the change events since that version are
+    checked against those rows: the entry is dropped only if its decision,
+    questions, concerns, goals or tasks changed, or a goal or task was added
+    to it. Otherwise the cached graph is returned without reading any table.
+
+    downstream() and upstream() answer impact and lineage questions ("which
+    tasks trace back to this concern", "which concerns justify this task")
+    from a ReachabilityIndex kept in step with the portfolio graph.
+    csr_graph() gives an array-backed CSRGraph snapshot for analytics over
+    the whole workspace.
+
+    Views are shared between callers and must not be modified; hold
+    store.reading() while iterating one so a concurrent edit cannot change
+    the underlying graph.
+    """
+
+    # Tables whose changes can affect a decision graph
+    GRAPH_TABLES = ('concerns_df', 'questions_df', 'decisions_df', 'goals_df', 'tasks_df')
+
+    def __init__(self, pipeline_service, max_cached=32):
         self.pipeline_service = pipeline_service
+        self.portfolio = PortfolioGraph(pipeline_service)
+        self.reachability = ReachabilityIndex(self.portfolio)
+        self.max_cached = max_cached
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        # (workspace version, CSRGraph)
+        self._csr = (None, None)
 
     def generate_decision_graph(self, decision):
-        """Generate NetworkX graph for a specific decision"""
-        G = nx.DiGraph()
-        
-        # Get related data
-        decision_data = self.pipeline_service.get_decision_data(decision)
-        if not decision_data:
-            return None
-
-        # Add decision and rationale nodes
-        G.add_node('d1', text=f"Decision:\n{decision}", node_type='decision')
-        G.add_node('r1', text=f"Rationale:\n{decision_data['rationale']}", node_type='rationale')
-        G.add_edge('d1', 'r1')
-
-        # Track unique concerns to avoid duplicates
-        unique_concerns = {}  # concern text -> node id mapping
-
-        # Add questions and their concerns
-        for idx, q_data in enumerate(decision_data['questions_data']):
-            q_node_id = f"q{idx+1}"
-            concern_text = q_data['concern']
-            
-            # Check if we've already created a node for this concern
-            if concern_text in unique_concerns:
-                c_node_id = unique_concerns[concern_text]
+        """Get the graph for a specific decision as a subgraph view of the portfolio graph"""
+        self.portfolio.sync()
+        return self.decision_graph_view(decision)
+
+    def decision_graph_view(self, decision):
+        """Like generate_decision_graph, but from the portfolio graph as of its last sync.
+
+        Does not sync (which takes the write lock), so it is safe to call
+        while holding store.reading(); call portfolio_graph() first to bring
+        the graph up to date.
+        """
+        store = self.pipeline_service.store
+        with store.reading():
+            if isinstance(decision, (int, np.integer)) and not isinstance(decision, bool):
+                # Ids of deleted decisions are evicted, so a cached id is still valid
+                decision_id = int(decision)
             else:
-                c_node_id = f"c{len(unique_concerns) + 1}"
-                unique_concerns[concern_text] = c_node_id
-                G.add_node(c_node_id, text=f"Concern:\n{concern_text}", node_type='concern')
-            
-            G.add_node(q_node_id, text=f"Question:\n{q_data['question']}", node_type='question')
-            
-            # Connect concern to question and question to decision
-            G.add_edge(c_node_id, q_node_id)
-            G.add_edge(q_node_id, 'd1')
-
-        # Add goals and tasks
-        self._add_goals_and_tasks(G, decision)
-
-        return G
-
-    def _add_goals_and_tasks(self, G, decision):
-        """Add goals and tasks to the graph"""
-        goals = self.pipeline_service.get_goals_for_decision(decision)
-        
-        for idx, goal in enumerate(goals):
-            g_node_id = f"g{idx}"
-            G.add_node(g_node_id, text=f"Goal:\n{goal['goal']}", node_type='goal')
-            G.add_edge('d1', g_node_id)
-
-            tasks = self.pipeline_service.get_tasks_for_goal(goal['goal'])
-            for t_idx, task in enumerate(tasks):
-                t_node_id = f"t{t_idx}"
-                G.add_node(t_node_id, 
-                          text=f"Task:\n{task['task']}\nAssignee: {task['assignee']}", 
-                          node_type='task')
-                G.add_edge(g_node_id, t_node_id)
+                decision_id = self.pipeline_service.get_id('decisions_df', decision)
+                if decision_id is None:
+                    return None
+
+            with self._lock:
+                entry = self._cache.get(decision_id)
+                if entry is not None:
+                    self._cache.move_to_end(decision_id)
+            if entry is not None:
+                if self._is_current(decision_id, entry):
+                    return entry['graph']
+                self._evict(decision_id)
+
+            # The version the portfolio graph reflects, which an edit made since
+            # sync() may have moved the store past
+            version = self.portfolio.version
+            G, rows = self._build_graph(decision_id)
+            if G is None:
+                return None
+            with self._lock:
+                self._cache[decision_id] = {'graph': G, 'version': version, 'rows': rows}
+                self._cache.move_to_end(decision_id)
+                while len(self._cache) > self.max_cached:
+                    self._cache.popitem(last=False)
+            return G
+
+    def clear_cache(self):
+        """Drop every cached graph"""
+        with self._lock:
+            self._cache.clear()
+
+    def _is_current(self, decision_id, entry):
+        """Check the changes since entry was validated against the rows it was built from"""
+        changes = self.pipeline_service.store.changes
+        version = changes.version
+        if entry['version'] == version:
+            return True
+        events = changes.since(entry['version'])
+        if events is None:
+            return False
+
+        rows = entry['rows']
+        added = {'goals_df': [], 'tasks_df': []}
+        for event in events:
+            if event.table not in self.GRAPH_TABLES:
+                continue
+            if event.key is None or event.key in rows[event.table]:
+                return False
+            if event.table in added and event.op != 'delete':
+                added[event.table].append(event.key)
+
+        # A goal or task that was added, or re-parented, into this decision's tree
+        if added['goals_df'] and decision_id in self.pipeline_service.get_parent_ids('goals_df', added['goals_df']):
+            return False
+        if added['tasks_df'] and not rows['goals_df'].isdisjoint(
+            self.pipeline_service.get_parent_ids('tasks_df', added['tasks_df'])
+        ):
+            return False
+
+        entry['version'] = version
+        return True
+
+    def _evict(self, decision_id):
+        with self._lock:
+            self._cache.pop(decision_id, None)
+
+    def portfolio_graph(self):
+        """Return the workspace-wide graph, brought up to date.
+
+        Hold store.reading() while using it, or views of it, so a concurrent
+        edit cannot change it mid-iteration.
+        """
+        return self.portfolio.sync()
+
+    def csr_graph(self):
+        """Return a CSRGraph of the workspace, rebuilt only if it changed since the last call"""
+        store = self.pipeline_service.store
+        with store.reading():
+            version = store.changes.version
+            built, csr = self._csr
+            if built != version:
+                changed = None if built is None else store.changes.changed_tables(built)
+                if changed is None or not changed.isdisjoint(CSRGraph.NODE_TABLES):
+                    csr = CSRGraph.from_store(store)
+                self._csr = (version, csr)
+            return csr
+
+    def downstream(self, table, ref, node_type=None):
+        """Get what an item impacts: {node type: ids} of every item reachable from it.
+
+        With node_type (e.g. 'task') only that type's ids are returned, as a
+        frozenset. Returns None if the item does not exist.
+        """
+        return self._reach(table, ref, node_type, self.reachability.descendants)
+
+    def upstream(self, table, ref, node_type=None):
+        """Get an item's lineage: {node type: ids} of every item it traces back to.
+
+        With node_type (e.g. 'concern') only that type's ids are returned, as
+        a frozenset. Returns None if the item does not exist.
+        """
+        return self._reach(table, ref, node_type, self.reachability.ancestors)
+
+    def _reach(self, table, ref, node_type, closure):
+        self.portfolio.sync()
+        with self.pipeline_service.store.reading():
+            item_id = self.pipeline_service.get_id(table, ref)
+            if item_id is None:
+                return None
+            node = PortfolioGraph.node_id(PortfolioGraph.NODE_TABLES[table][0], item_id)
+            if node not in self.portfolio.graph:
+                # Created after the sync above
+                return None
+            reached = closure(node)
+        if node_type is not None:
+            return reached.get(node_type, frozenset())
+        return dict(reached)
+
+    def _build_graph(self, decision_id):
+        """Return a subgraph view of the portfolio graph for a decision, with {table: ids} of its rows"""
+        G = self.portfolio.graph
+        d_node = PortfolioGraph.node_id('decision', decision_id)
+        if d_node not in G:
+            return None, None
+
+        nodes = {d_node, PortfolioGraph.node_id('rationale', decision_id)}
+        questions = list(G.predecessors(d_node))
+        concerns = {concern for question in questions for concern in G.predecessors(question)}
+        goals = [node for node in G.successors(d_node) if G.nodes[node]['node_type'] == 'goal']
+        tasks = [task for goal in goals for task in G.successors(goal)]
+        nodes.update(questions, concerns, goals, tasks)
+
+        rows = {
+            'decisions_df': {decision_id},
+            'questions_df': {G.nodes[node]['id'] for node in questions},
+            'concerns_df': {G.nodes[node]['id'] for node in concerns},
+            'goals_df': {G.nodes[node]['id'] for node in goals},
+            'tasks_df': {G.nodes[node]['id'] for node in tasks}
+        }
+        return G.subgraph(nodes), rows
@@ -0,0 +1,257 @@
+import atexit
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from models.data_models import DataFrameModel
+from services.storage_service import StorageService
+from services.workspace_store import InMemoryStore
+
+class MutationJournal:
+    """Append-only on-disk log of workspace mutations, for crash recovery.
+
+    PipelineService reports each low-level write (rows appended, a cell
+    assigned, rows dropped, todos re-sorted) as one JSON line with a sequence
+    number. Lines are handed to a background thread that batches everything
+    arriving within `delay` seconds into one sequential append, so an edit
+    costs a small write instead of a full workbook save.
+
+    Every `checkpoint_every` entries (and after a whole workspace is loaded)
+    the tables are written as Parquet files to a checkpoint directory and the
+    journal is truncated. recover() loads the latest checkpoint and replays
+    the journal entries recorded after it.
+
+    Layout of directory:
+        CHECKPOINT         {"seq": n, "directory": "checkpoint-n"}
+        checkpoint-n/      one Parquet file per table, state after entry n
+        journal.jsonl      entries with seq > n
+    """
+
+    JOURNAL_FILE = 'journal.jsonl'
+    POINTER_FILE = 'CHECKPOINT'
+
+    def __init__(self, directory='decision_pipeline_journal', delay=0.5, checkpoint_every=1000):
+        self.directory = directory
+        self.delay = delay
+        self.checkpoint_every = checkpoint_every
+        self.storage = StorageService()
+        os.makedirs(directory, exist_ok=True)
+
+        # Last exception raised by the writer thread, if any
+        self.error = None
+        self._lock = threading.Lock()
+        self._truncate_torn_tail()
+        pointer = self._read_pointer()
+        self._checkpoint_seq = pointer['seq'] if pointer else 0
+        entries = self._read_entries(self._checkpoint_seq)
+        self._seq = entries[-1]['seq'] if entries else self._checkpoint_seq
+
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._run, name='mutation-journal', daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def append(self, op, table, **fields):
+        """Queue one mutation for writing; fields must be JSON-serializable or DataFrames"""
+        with self._lock:
+            self._seq += 1
+            self._queue.put(('entry', dict(seq=self._seq, op=op, table=table, **fields)))
+
+    def checkpoint_due(self):
+        """True once checkpoint_every entries were recorded since the last checkpoint"""
+        return self._seq - self._checkpoint_seq >= self.checkpoint_every
+
+    def checkpoint(self, store):
+        """Queue a checkpoint of every table in store as of the latest entry"""
+        # Shallow copies are enough (see models.data_models on copy-on-write).
+        # Writers journal under the store's write lock, so the read lock also
+        # keeps the sequence number in step with the snapshot.
+        with store.reading():
+            snapshot = {
+                name: store.get(name).copy(deep=False)
+                for name in StorageService.TABLE_NAMES if name in store
+            }
+            with self._lock:
+                self._checkpoint_seq = self._seq
+                self._queue.put(('checkpoint', (self._seq, snapshot)))
+
+    def recover(self, store):
+        """Load the last checkpoint into store and replay the journal after it.
+
+        Returns the number of entries replayed, or None if there was nothing
+        to recover.
+        """
+        self.flush()
+        pointer = self._read_pointer()
+        entries = self._read_entries(pointer['seq'] if pointer else 0)
+        if pointer is None and not entries:
+            return None
+
+        if pointer is not None:
+            frames = self.storage.read_columnar_frames(
+                os.path.join(self.directory, pointer['directory']), 'parquet'
+            )
+        else:
+            frames = {name: getattr(self.storage.model, f'create_{name[:-3]}_df')()
+                      for name in StorageService.TABLE_NAMES}
+        for entry in entries:
+            self._apply(frames, entry)
+        with store.writing():
+            for name, df in frames.items():
+                store.set(name, df)
+                store.changes.emit(name, None, 'replace')
+            # The replayed edits were never saved to a file, so count them as unsaved
+            store.mark_saved(None)
+            for entry in entries:
+                store.mark_dirty(entry['table'], self._entry_ids(entry))
+        return len(entries)
+
+    def flush(self):
+        """Block until everything queued so far is on disk"""
+        self._queue.join()
+
+    def close(self):
+        """Flush and stop the background writer"""
+        if self._writer.is_alive():
+            self._queue.put(('stop', None))
+            self._writer.join()
+
+    def _run(self):
+        """Writer thread: batch entries arriving within delay seconds into one append"""
+        while True:
+            items = [self._queue.get()]
+            deadline = time.monotonic() + self.delay
+            while items[-1][0] == 'entry':
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                lines = [self._encode(payload) for kind, payload in items if kind == 'entry']
+                if lines:
+                    with open(os.path.join(self.directory, self.JOURNAL_FILE), 'a', encoding='utf-8') as f:
+                        f.write(''.join(lines))
+                        f.flush()
+                        os.fsync(f.fileno())
+            except Exception as e:
+                self.error = e
+            for kind, payload in items:
+                try:
+                    if kind == 'checkpoint':
+                        self._write_checkpoint(*payload)
+                except Exception as e:
+                    # The journal is only truncated by a successful checkpoint,
+                    # so the previous checkpoint plus the journal still recover
+                    self.error = e
+                finally:
+                    self._queue.task_done()
+            if items[-1][0] == 'stop':
+                return
+
+    def _write_checkpoint(self, seq, snapshot):
+        """Write snapshot as checkpoint seq, switch the pointer to it and drop older data"""
+        name = f'checkpoint-{seq}'
+        self.storage.save_to_columnar(InMemoryStore(snapshot), os.path.join(self.directory, name), 'parquet')
+
+        pointer_path = os.path.join(self.directory, self.POINTER_FILE)
+        with open(pointer_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'seq': seq, 'directory': name}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(pointer_path + '.tmp', pointer_path)
+
+        # Every entry written so far is covered by the checkpoint
+        open(os.path.join(self.directory, self.JOURNAL_FILE), 'w').close()
+        for entry in os.listdir(self.directory):
+            if entry.startswith('checkpoint-') and entry != name:
+                shutil.rmtree(os.path.join(self.directory, entry), ignore_errors=True)
+
+    @staticmethod
+    def _encode(entry):
+        """Serialize an entry as one JSON line; appended rows go through DataFrame.to_json"""
+        rows = entry.pop('rows', None)
+        line = json.dumps(entry, default=MutationJournal._json_default)
+        if rows is not None:
+            line = line[:-1] + ', "rows": ' + rows.to_json(orient='records', date_format='iso', date_unit='us') + '}'
+        return line + '\n'
+
+    @staticmethod
+    def _json_default(value):
+        if isinstance(value, np.integer):
+            return int(value)
+        if isinstance(value, np.floating):
+            return float(value)
+        if isinstance(value, (datetime, np.datetime64)):
+            return pd.Timestamp(value).isoformat()
+        raise TypeError(f"Cannot journal value of type {type(value).__name__}")
+
+    def _read_pointer(self):
+        try:
+            with open(os.path.join(self.directory, self.POINTER_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _truncate_torn_tail(self):
+        """Cut off a partial last line left by a crash so new entries start on a line of their own"""
+        try:
+            with open(os.path.join(self.directory, self.JOURNAL_FILE), 'rb+') as f:
+                data = f.read()
+                end = data.rfind(b'\n') + 1
+                if end < len(data):
+                    f.truncate(end)
+        except FileNotFoundError:
+            pass
+
+    def _read_entries(self, after_seq):
+        """Return journal entries with seq > after_seq, ignoring a torn final line"""
+        entries = []
+        try:
+            with open(os.path.join(self.directory, self.JOURNAL_FILE), encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A crash mid-append leaves at most one partial line
+                        break
+                    if entry['seq'] > after_seq:
+                        entries.append(entry)
+        except FileNotFoundError:
+            pass
+        return entries
+
+    @staticmethod
+    def _entry_ids(entry):
+        """Ids of the rows a journal entry changed"""
+        if entry['op'] == 'append':
+            return [row['id'] for row in entry['rows']]
+        if entry['op'] == 'assign':
+            return [entry['id']]
+        return entry.get('ids', [])
+
+    @staticmethod
+    def _apply(frames, entry):
+        """Redo one journal entry against a dict of DataFrames"""
+        table = entry['table']
+        df = frames[table]
+        if entry['op'] == 'append':
+            rows = pd.DataFrame(entry['rows'], columns=df.columns)
+            rows.index = rows['id'].to_numpy()
+            frames[table] = DataFrameModel.concat(df, rows)
+        elif entry['op'] == 'assign':
+            DataFrameModel.set_value(df, entry['id'], entry['column'], entry['value'])
+        elif entry['op'] == 'drop':
+            frames[table] = df[~df.index.isin(entry['ids'])]
+        elif entry['op'] == 'sort':
+            frames[table] = df.sort_values(entry['by'], ascending=entry['ascending'], kind='stable')
+        else:
+            raise ValueError(f"Unknown journal operation: {entry['op']}")
@@ -0,0 +1,148 @@
+import threading
+
+class PipelineIndex:
+    """Hash indexes over the pipeline tables kept in a workspace store.
+
+    Rows are labelled by their id. For every table it maps entity text to ids,
+    and for child tables it maps the parent id to the child ids, so
+    PipelineService can find rows in O(1)/O(k) instead of scanning whole
+    DataFrames. List columns (a decision's question_ids) are indexed per
+    element, giving an inverted question -> decisions index. Ids are stored in
+    dicts used as ordered sets so removals are O(1) too.
+
+    An index is tied to the DataFrame object it was built from; when a table is
+    replaced behind its back (e.g. by StorageService.load_from_excel) it is
+    rebuilt lazily on the next lookup. Rebuilds are serialized so concurrent
+    readers of a shared store build each index once.
+    """
+
+    KEY_COLUMNS = {
+        'concerns_df': 'concern',
+        'questions_df': 'question',
+        'decisions_df': 'decision',
+        'goals_df': 'goal',
+        'tasks_df': 'task',
+        'todos_df': 'title'
+    }
+
+    PARENT_COLUMNS = {
+        'questions_df': 'concern_id',
+        'decisions_df': 'question_ids',
+        'goals_df': 'decision_id',
+        'tasks_df': 'goal_id'
+    }
+
+    # Parent columns holding a list of parent ids rather than a single id
+    LIST_COLUMNS = {'question_ids'}
+
+    def __init__(self, store):
+        self.store = store
+        self._build_lock = threading.Lock()
+        self._frames = {}
+        self._next_id = {}
+        self._indexes = {}
+
+    def rows(self, table, key):
+        """Return the ids of rows whose key column equals key"""
+        return list(self._index(table, self.KEY_COLUMNS[table]).get(key, ()))
+
+    def first_row(self, table, key):
+        """Return the first id for key, or None if there is none"""
+        ids = self._index(table, self.KEY_COLUMNS[table]).get(key)
+        return next(iter(ids)) if ids else None
+
+    def first_rows(self, table):
+        """Return a mapping of every key in table to its first id"""
+        return {key: next(iter(ids)) for key, ids in self._index(table, self.KEY_COLUMNS[table]).items()}
+
+    def child_rows(self, table, parent_id):
+        """Return the ids of rows in table whose parent column equals parent_id"""
+        return list(self._index(table, self.PARENT_COLUMNS[table]).get(parent_id, ()))
+
+    def allocate_ids(self, table, count):
+        """Reserve count fresh ids for rows about to be appended"""
+        self._ensure(table)
+        start = self._next_id[table]
+        self._next_id[table] = start + count
+        return range(start, start + count)
+
+    def rows_added(self, table, rows):
+        """Record appended rows; call after the grown table is in the store"""
+        self._ensure_columns(table)
+        for column, index in self._indexes[table].items():
+            for row_id, value in zip(rows.index.tolist(), rows[column].tolist()):
+                for key in self._keys(column, value):
+                    index.setdefault(key, {})[row_id] = None
+        self._frames[table] = self.store.get(table)
+
+    def rows_removed(self, table, rows):
+        """Record dropped rows; call after the shrunk table is in the store"""
+        self._ensure_columns(table)
+        for column, index in self._indexes[table].items():
+            for row_id, value in zip(rows.index.tolist(), rows[column].tolist()):
+                for key in self._keys(column, value):
+                    self._discard(index, key, row_id)
+        self._frames[table] = self.store.get(table)
+
+    def value_changed(self, table, column, row_id, old_value, new_value):
+        """Move a row from old_value to new_value if column is indexed"""
+        index = self._indexes.get(table, {}).get(column)
+        if index is None:
+            return
+        old_keys = set(self._keys(column, old_value))
+        new_keys = set(self._keys(column, new_value))
+        for key in old_keys - new_keys:
+            self._discard(index, key, row_id)
+        for key in new_keys - old_keys:
+            index.setdefault(key, {})[row_id] = None
+
+    def frame_replaced(self, table):
+        """Accept a reordered copy of a table (same rows and ids) as current"""
+        if table in self._indexes:
+            self._frames[table] = self.store.get(table)
+
+    def _index(self, table, column):
+        self._ensure(table)
+        return self._indexes[table][column]
+
+    def _ensure(self, table):
+        df = self.store.get(table)
+        if self._frames.get(table) is not df:
+            with self._build_lock:
+                if self._frames.get(table) is not df:
+                    self._build(table, df)
+
+    def _ensure_columns(self, table):
+        if table not in self._indexes:
+            self._build(table, self.store.get(table))
+
+    def _build(self, table, df):
+        columns = [self.KEY_COLUMNS[table]]
+        if table in self.PARENT_COLUMNS:
+            columns.append(self.PARENT_COLUMNS[table])
+
+        indexes = {}
+        for column in columns:
+            index = {}
+            for row_id, value in zip(df.index.tolist(), df[column].tolist()):
+                for key in self._keys(column, value):
+                    index.setdefault(key, {})[row_id] = None
+            indexes[column] = index
+        self._indexes[table] = indexes
+
+        self._next_id[table] = int(df['id'].max()) + 1 if len(df) else 0
+        self._frames[table] = df
+
+    def _keys(self, column, value):
+        """Index keys for a cell: each element of a list column, else the value itself"""
+        if column in self.LIST_COLUMNS:
+            return value if isinstance(value, list) else ()
+        return (value,)
+
+    @staticmethod
+    def _discard(index, value, row_id):
+        ids = index.get(value)
+        if ids is not None:
+            ids.pop(row_id, None)
+            if not ids:
+                del index[value]
@@ -1,16 +1,79 @@
 from datetime import datetime
+import functools
+import numpy as np
 import pandas as pd
+from models.data_models import DataFrameModel
+from services.cascade_engine import CascadeEngine
+from services.pipeline_index import PipelineIndex
+
+def _reads(method):
+    """Run a PipelineService method under the store's read lock"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.store.reading():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+def _writes(method):
+    """Run a PipelineService method under the store's write lock"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.store.writing():
+            return method(self, *args, **kwargs)
+    return wrapper
 
 class PipelineService:
-    def __init__(self, st):
-        self.st = st
-        
+    """Create, read, update and delete pipeline items in a workspace store.
+
+    Methods that refer to an existing item accept either its integer id or its
+    text; text is resolved to the first item with that text. If a
+    MutationJournal is given, every write is also appended to it. Every write
+    also emits an event on the store's ChangeFeed.
+
+    Public methods hold the store's read or write lock, and stored tables are
+    replaced rather than modified in place, so one service can be shared by
+    every session over a SharedWorkspaceStore.
+    """
+
+    def __init__(self, store, journal=None):
+        self.store = store
+        self.journal = journal
+        self.index = PipelineIndex(store)
+        self.cascade = CascadeEngine(self.index)
+
+    @_reads
     def get_all_decisions(self):
         """Get all decisions from the decisions dataframe"""
-        if 'decisions_df' in self.st.session_state:
-            return self.st.session_state.decisions_df.to_dict('records')
+        if 'decisions_df' in self.store:
+            return self.store.get('decisions_df').to_dict('records')
         return []
 
+    @_reads
+    def get_names(self, table):
+        """Get an ordered mapping of id -> display text for a table"""
+        df = self.store.get(table)
+        return dict(zip(df['id'], df[PipelineIndex.KEY_COLUMNS[table]]))
+
+    @_reads
+    def get_item(self, table, ref):
+        """Get a single item as a dict, or None if it does not exist"""
+        item_id = self._resolve(table, ref)
+        if item_id is None:
+            return None
+        return self.store.get(table).loc[item_id].to_dict()
+
+    @_reads
+    def get_id(self, table, ref):
+        """Get the id for ref (an id or an item's text), or None if it does not exist"""
+        return self._resolve(table, ref)
+
+    @_reads
+    def get_parent_ids(self, table, ids):
+        """Get the set of parent ids of the given rows of a child table, skipping rows that no longer exist"""
+        df = self.store.get(table)
+        return set(df.loc[df.index.intersection(ids), PipelineIndex.PARENT_COLUMNS[table]].tolist())
+
+    @_writes
     def add_concern(self, concern, urgency):
         """Add a new concern with urgency level"""
         if concern:
@@ -19,80 +82,74 @@ class PipelineService:
                 'urgency': [urgency],
                 'date_added': [datetime.now()]
             })
-            self.st.session_state.concerns_df = pd.concat(
-                [self.st.session_state.concerns_df, new_concern], 
-                ignore_index=True
-            )
+            self._append('concerns_df', new_concern)
             return True
         return False
 
+    @_writes
     def add_question(self, question, related_concern, urgency):
         """Add a new question with urgency level"""
-        if question and related_concern:
+        concern_id = self._resolve('concerns_df', related_concern)
+        if question and concern_id is not None:
             new_question = pd.DataFrame({
                 'question': [question],
-                'related_concern': [related_concern],
+                'concern_id': [concern_id],
                 'urgency': [urgency],
                 'date_added': [datetime.now()]
             })
-            self.st.session_state.questions_df = pd.concat(
-                [self.st.session_state.questions_df, new_question], 
-                ignore_index=True
-            )
+            self._append('questions_df', new_question)
             return True
         return False
 
+    @_writes
     def add_decision(self, decision, rationale, related_questions, urgency):
         """Add a new decision with urgency level"""
-        if decision and rationale and related_questions:
+        question_ids = self._resolve_list('questions_df', related_questions or [])
+        if decision and rationale and question_ids:
             new_decision = pd.DataFrame({
                 'decision': [decision],
                 'rationale': [rationale],
-                'related_questions': [related_questions],  # Now accepts a list
+                'question_ids': [question_ids],  # Accepts a list
                 'urgency': [urgency],
                 'date_added': [datetime.now()]
             })
-            self.st.session_state.decisions_df = pd.concat(
-                [self.st.session_state.decisions_df, new_decision], 
-                ignore_index=True
-            )
+            self._append('decisions_df', new_decision)
             return True
         return False
-    
+
+    @_writes
     def add_goal(self, goal, related_decision, urgency):
         """Add a new goal with urgency level"""
-        if goal and related_decision:
+        decision_id = self._resolve('decisions_df', related_decision)
+        if goal and decision_id is not None:
             new_goal = pd.DataFrame({
                 'goal': [goal],
-                'related_decision': [related_decision],
+                'decision_id': [decision_id],
                 'urgency': [urgency],
                 'date_added': [datetime.now()]
             })
-            self.st.session_state.goals_df = pd.concat(
-                [self.st.session_state.goals_df, new_goal], 
-                ignore_index=True
-            )
+            self._append('goals_df', new_goal)
             return True
         return False
 
+    @_writes
     def add_task(self, task, assignee, related_goal, urgency):
         """Add a new task with urgency level"""
-        if task and assignee and related_goal:
+        goal_id = self._resolve('goals_df', related_goal)
+        if task and assignee and goal_id is not None:
             new_task = pd.DataFrame({
                 'task': [task],
                 'assignee': [assignee],
-                'related_goal': [related_goal],
+                'goal_id': [goal_id],
                 'status': ['Not Started'],
                 'urgency': [urgency],
                 'date_added': [datetime.now()]
             })
-            self.st.session_state.tasks_df = pd.concat(
-                [self.st.session_state.tasks_df, new_task], 
-                ignore_index=True
-            )
+            self._append('tasks_df', new_task)
             return True
         return False
 
+    @_writes
     def add_todo(self, title, details, categories, importance):
         """Add a new todo item with multiple categories"""
         if title and details and categories:
@@ -103,232 +160,390 @@ class PipelineService:
                 'importance': [importance],
                 'date_added': [datetime.now()]
             })
-            if 'todos_df' not in self.st.session_state:
-                self.st.session_state.todos_df = pd.DataFrame(columns=['title', 'details', 'categories', 'importance', 'date_added'])
-            self.st.session_state.todos_df = pd.concat(
-                [self.st.session_state.todos_df, new_todo],
-                ignore_index=True
-            ).sort_values('importance', ascending=False)
+            if 'todos_df' not in self.store:
+                self.store.set('todos_df', DataFrameModel.create_todos_df())
+            self._append('todos_df', new_todo)
+            self._sort_todos()
             return True
         return False
 
-    def update_todo(self, old_title, new_title=None, new_details=None, new_categories=None, new_importance=None):
+    @_writes
+    def add_concerns_many(self, items):
+        """Add many concerns at once from (concern, urgency) rows or a DataFrame"""
+        batch = self._prepare_batch(items, ['concern', 'urgency'], required=['concern'])
+        return self._append_batch('concerns_df', batch)
+
+    @_writes
+    def add_questions_many(self, items):
+        """Add many questions at once from (question, related_concern, urgency) rows or a DataFrame"""
+        batch = self._prepare_batch(
+            items, ['question', 'related_concern', 'urgency'],
+            required=['question', 'related_concern']
+        )
+        batch = self._resolve_batch(batch, 'related_concern', 'concerns_df', 'concern_id')
+        return self._append_batch('questions_df', batch)
+
+    @_writes
+    def add_decisions_many(self, items):
+        """Add many decisions at once from (decision, rationale, related_questions, urgency) rows or a DataFrame"""
+        batch = self._prepare_batch(
+            items, ['decision', 'rationale', 'related_questions', 'urgency'],
+            required=['decision', 'rationale'], list_columns=['related_questions']
+        )
+        # Resolve every referenced question in one pass over the exploded lists
+        refs = batch['related_questions'].explode()
+        ids = self._resolve_series('questions_df', refs).dropna().astype('int64')
+        question_ids = {}
+        for row, question_id in zip(ids.index, ids.tolist()):
+            question_ids.setdefault(row, []).append(question_id)
+        batch = batch.loc[list(question_ids)]
+        batch['related_questions'] = list(question_ids.values())
+        batch = batch.rename(columns={'related_questions': 'question_ids'})
+        return self._append_batch('decisions_df', batch)
+
+    @_writes
+    def add_goals_many(self, items):
+        """Add many goals at once from (goal, related_decision, urgency) rows or a DataFrame"""
+        batch = self._prepare_batch(
+            items, ['goal', 'related_decision', 'urgency'],
+            required=['goal', 'related_decision']
+        )
+        batch = self._resolve_batch(batch, 'related_decision', 'decisions_df', 'decision_id')
+        return self._append_batch('goals_df', batch)
+
+    @_writes
+    def add_tasks_many(self, items):
+        """Add many tasks at once from (task, assignee, related_goal, urgency) rows or a DataFrame"""
+        batch = self._prepare_batch(
+            items, ['task', 'assignee', 'related_goal', 'urgency'],
+            required=['task', 'assignee', 'related_goal']
+        )
+        batch = self._resolve_batch(batch, 'related_goal', 'goals_df', 'goal_id')
+        batch.insert(3, 'status', 'Not Started')
+        return self._append_batch('tasks_df', batch)
+
+    @_writes
+    def add_todos_many(self, items):
+        """Add many todo items at once from (title, details, categories, importance) rows or a DataFrame"""
+        batch = self._prepare_batch(
+            items, ['title', 'details', 'categories', 'importance'],
+            required=['title', 'details'], list_columns=['categories']
+        )
+        if 'todos_df' not in self.store:
+            self.store.set('todos_df', DataFrameModel.create_todos_df())
+        added = self._append_batch('todos_df', batch)
+        if added:
+            # Sort once for the whole batch instead of once per item
+            self._sort_todos()
+        return added
+
+    def _prepare_batch(self, items, columns, required, list_columns=()):
+        """Build a DataFrame from rows, keeping only those the single add_* methods would accept"""
+        if isinstance(items, pd.DataFrame):
+            batch = items.reindex(columns=columns)
+        else:
+            batch = pd.DataFrame(list(items), columns=columns)
+
+        valid = pd.Series(True, index=batch.index)
+        for column in required:
+            valid &= batch[column].notna() & (batch[column] != '')
+        for column in list_columns:
+            valid &= batch[column].map(self._is_ref_list).astype(bool)
+        for column in DataFrameModel.SCORE_COLUMNS:
+            if column in batch:
+                batch[column] = DataFrameModel.to_scores(batch[column])
+                valid &= batch[column].notna()
+        return batch[valid].reset_index(drop=True)
+
+    @staticmethod
+    def _is_ref_list(value):
+        """True for a non-empty list of ids or non-empty text (question refs, categories)"""
+        return isinstance(value, list) and len(value) > 0 and all(
+            (isinstance(item, (int, np.integer)) and not isinstance(item, bool))
+            or (isinstance(item, str) and item != '')
+            for item in value
+        )
+
+    def _resolve_batch(self, batch, ref_column, table, id_column):
+        """Replace a column of parent references with parent ids, dropping unknown parents"""
+        ids = self._resolve_series(table, batch[ref_column])
+        batch = batch[ids.notna()].copy()
+        batch[ref_column] = ids[ids.notna()].astype('int64')
+        return batch.rename(columns={ref_column: id_column})
+
+    def _append_batch(self, name, batch):
+        """Append validated rows to a table with a single concat"""
+        if batch.empty:
+            return 0
+        batch['date_added'] = datetime.now()
+        self._append(name, batch)
+        return len(batch)
+
+    @_writes
+    def update_todo(self, todo, new_title=None, new_details=None, new_categories=None, new_importance=None):
         """Update a todo item"""
-        if old_title:
-            mask = self.st.session_state.todos_df['title'] == old_title
+        todo_id = self._resolve('todos_df', todo)
+        if todo_id is not None:
             if new_title:
-                self.st.session_state.todos_df.loc[mask, 'title'] = new_title
+                self._assign('todos_df', todo_id, 'title', new_title)
             if new_details:
-                self.st.session_state.todos_df.loc[mask, 'details'] = new_details
+                self._assign('todos_df', todo_id, 'details', new_details)
             if new_categories:
-                self.st.session_state.todos_df.loc[mask, 'categories'] = [new_categories]  # Wrap in list since it's a list column
+                self._assign('todos_df', todo_id, 'categories', new_categories)
             if new_importance is not None:
-                self.st.session_state.todos_df.loc[mask, 'importance'] = new_importance
+                self._assign('todos_df', todo_id, 'importance', new_importance)
             # Re-sort by importance
-            self.st.session_state.todos_df = self.st.session_state.todos_df.sort_values('importance', ascending=False)
+            self._sort_todos()
             return True
         return False
 
-    def delete_todo(self, title):
+    @_writes
+    def delete_todo(self, todo):
         """Delete a todo item"""
-        if title:
-            self.st.session_state.todos_df = self.st.session_state.todos_df[
-                self.st.session_state.todos_df['title'] != title
-            ]
+        todo_id = self._resolve('todos_df', todo)
+        if todo_id is not None:
+            self._drop('todos_df', [todo_id])
             return True
         return False
 
+    @_reads
     def get_decision_data(self, decision):
         """Get all related data for a decision"""
-        decision_row = self.st.session_state.decisions_df[
-            self.st.session_state.decisions_df['decision'] == decision
-        ].iloc[0]
-        
+        decision_id = self._resolve('decisions_df', decision)
+        if decision_id is None:
+            return None
+        decision_row = self.store.get('decisions_df').loc[decision_id]
+
         # Get data for all related questions
+        questions_df = self.store.get('questions_df')
+        concerns_df = self.store.get('concerns_df')
         questions_data = []
-        for question in decision_row['related_questions']:
-            question_row = self.st.session_state.questions_df[
-                self.st.session_state.questions_df['question'] == question
-            ].iloc[0]
+        for question_id in decision_row['question_ids']:
+            if question_id not in questions_df.index:
+                continue
+            concern_id = questions_df.at[question_id, 'concern_id']
+            # A question whose concern was missing on load has no concern text
+            concern = concerns_df.at[concern_id, 'concern'] if concern_id in concerns_df.index else None
             questions_data.append({
-                'question': question,
-                'concern': question_row['related_concern']
+                'question_id': question_id,
+                'question': questions_df.at[question_id, 'question'],
+                'concern_id': concern_id,
+                'concern': concern
             })
-        
+
         return {
-            'decision': decision,
+            'decision_id': decision_id,
+            'decision': decision_row['decision'],
             'rationale': decision_row['rationale'],
             'questions_data': questions_data
         }
 
+    @_reads
+    def get_decisions_for_question(self, question):
+        """Get all decisions that include a question"""
+        rows = self.index.child_rows('decisions_df', self._resolve('questions_df', question))
+        return self.store.get('decisions_df').loc[rows].to_dict('records')
+
+    @_reads
     def get_goals_for_decision(self, decision):
         """Get all goals related to a decision"""
-        return self.st.session_state.goals_df[
-            self.st.session_state.goals_df['related_decision'] == decision
-        ].to_dict('records')
+        rows = self.index.child_rows('goals_df', self._resolve('decisions_df', decision))
+        return self.store.get('goals_df').loc[rows].to_dict('records')
 
+    @_reads
     def get_tasks_for_goal(self, goal):
         """Get all tasks related to a goal"""
-        return self.st.session_state.tasks_df[
-            self.st.session_state.tasks_df['related_goal'] == goal
-        ].to_dict('records')
-
-    def update_concern(self, old_concern, new_concern):
-        """Update a concern and cascade the change to related items"""
-        if old_concern and new_concern:
-            # Update the concern itself
-            mask = self.st.session_state.concerns_df['concern'] == old_concern
-            self.st.session_state.concerns_df.loc[mask, 'concern'] = new_concern
-            
-            # Update related questions
-            mask = self.st.session_state.questions_df['related_concern'] == old_concern
-            self.st.session_state.questions_df.loc[mask, 'related_concern'] = new_concern
+        rows = self.index.child_rows('tasks_df', self._resolve('goals_df', goal))
+        return self.store.get('tasks_df').loc[rows].to_dict('records')
+
+    @_writes
+    def update_concern(self, concern, new_concern):
+        """Rename a concern; related questions refer to it by id"""
+        concern_id = self._resolve('concerns_df', concern)
+        if concern_id is not None and new_concern:
+            self._assign('concerns_df', concern_id, 'concern', new_concern)
             return True
         return False
 
-    def update_question(self, old_question, new_question, new_related_concern=None):
-        """Update a question and cascade the change to related items"""
-        if old_question and new_question:
-            # Update the question itself
-            mask = self.st.session_state.questions_df['question'] == old_question
-            self.st.session_state.questions_df.loc[mask, 'question'] = new_question
-            if new_related_concern:
-                self.st.session_state.questions_df.loc[mask, 'related_concern'] = new_related_concern
-            
-            # Update related decisions
-            decisions_mask = self.st.session_state.decisions_df['related_questions'].apply(
-                lambda questions: old_question in questions
-            )
-            
-            # Update the old question to the new question in the list
-            self.st.session_state.decisions_df.loc[decisions_mask, 'related_questions'] = \
-                self.st.session_state.decisions_df.loc[decisions_mask, 'related_questions'].apply(
-                    lambda questions: [new_question if q == old_question else q for q in questions]
-                )
+    @_writes
+    def update_question(self, question, new_question, new_related_concern=None):
+        """Update a question; related decisions refer to it by id"""
+        question_id = self._resolve('questions_df', question)
+        if question_id is not None and new_question:
+            self._assign('questions_df', question_id, 'question', new_question)
+            if new_related_concern is not None:
+                concern_id = self._resolve('concerns_df', new_related_concern)
+                if concern_id is not None:
+                    self._assign('questions_df', question_id, 'concern_id', concern_id)
             return True
         return False
 
-    def update_decision(self, old_decision, new_decision, new_rationale=None, new_related_questions=None):
-        """Update a decision and cascade the change to related items"""
-        if old_decision and new_decision:
-            # Update the decision itself
-            mask = self.st.session_state.decisions_df['decision'] == old_decision
-            self.st.session_state.decisions_df.loc[mask, 'decision'] = new_decision
+    @_writes
+    def update_decision(self, decision, new_decision, new_rationale=None, new_related_questions=None):
+        """Update a decision; related goals refer to it by id"""
+        decision_id = self._resolve('decisions_df', decision)
+        if decision_id is not None and new_decision:
+            self._assign('decisions_df', decision_id, 'decision', new_decision)
             if new_rationale:
-                self.st.session_state.decisions_df.loc[mask, 'rationale'] = new_rationale
+                self._assign('decisions_df', decision_id, 'rationale', new_rationale)
             if new_related_questions:
-                self.st.session_state.decisions_df.loc[mask, 'related_questions'] = new_related_questions
-            
-            # Update related goals
-            mask = self.st.session_state.goals_df['related_decision'] == old_decision
-            self.st.session_state.goals_df.loc[mask, 'related_decision'] = new_decision
+                question_ids = self._resolve_list('questions_df', new_related_questions)
+                if question_ids:
+                    self._assign('decisions_df', decision_id, 'question_ids', question_ids)
             return True
         return False
 
-    def update_goal(self, old_goal, new_goal, new_related_decision=None):
-        """Update a goal and cascade the change to related items"""
-        if old_goal and new_goal:
-            # Update the goal itself
-            mask = self.st.session_state.goals_df['goal'] == old_goal
-            self.st.session_state.goals_df.loc[mask, 'goal'] = new_goal
-            if new_related_decision:
-                self.st.session_state.goals_df.loc[mask, 'related_decision'] = new_related_decision
-            
-            # Update related tasks
-            mask = self.st.session_state.tasks_df['related_goal'] == old_goal
-            self.st.session_state.tasks_df.loc[mask, 'related_goal'] = new_goal
+    @_writes
+    def update_goal(self, goal, new_goal, new_related_decision=None):
+        """Update a goal; related tasks refer to it by id"""
+        goal_id = self._resolve('goals_df', goal)
+        if goal_id is not None and new_goal:
+            self._assign('goals_df', goal_id, 'goal', new_goal)
+            if new_related_decision is not None:
+                decision_id = self._resolve('decisions_df', new_related_decision)
+                if decision_id is not None:
+                    self._assign('goals_df', goal_id, 'decision_id', decision_id)
             return True
         return False
 
-    def update_task(self, old_task, new_task_data):
+    @_writes
+    def update_task(self, task, new_task_data):
         """Update a task"""
-        if old_task and new_task_data:
-            mask = self.st.session_state.tasks_df['task'] == old_task
+        task_id = self._resolve('tasks_df', task)
+        if task_id is not None and new_task_data:
             for key, value in new_task_data.items():
-                if value:
-                    self.st.session_state.tasks_df.loc[mask, key] = value
+                if key == 'related_goal':
+                    key, value = 'goal_id', self._resolve('goals_df', value)
+                    if value is None:
+                        continue
+                elif not value:
+                    continue
+                self._assign('tasks_df', task_id, key, value)
             return True
         return False
 
+    @_writes
     def delete_concern(self, concern):
         """Delete a concern and all related items"""
-        if concern:
-            # Get related questions
-            related_questions = self.st.session_state.questions_df[
-                self.st.session_state.questions_df['related_concern'] == concern
-            ]['question'].tolist()
-            
-            # Delete related questions and their children
-            for question in related_questions:
-                self.delete_question(question)
-            
-            # Delete the concern
-            self.st.session_state.concerns_df = self.st.session_state.concerns_df[
-                self.st.session_state.concerns_df['concern'] != concern
-            ]
-            return True
-        return False
+        return self._cascade_delete('concerns_df', concern)
 
+    @_writes
     def delete_question(self, question):
-        """Delete a question and all related items"""
-        if question:
-            # Get related decisions (those that have this question in their related_questions list)
-            related_decisions = self.st.session_state.decisions_df[
-                self.st.session_state.decisions_df['related_questions'].apply(
-                    lambda questions: question in questions
-                )
-            ]['decision'].tolist()
-            
-            # Delete related decisions and their children
-            for decision in related_decisions:
-                self.delete_decision(decision)
-            
-            # Delete the question
-            self.st.session_state.questions_df = self.st.session_state.questions_df[
-                self.st.session_state.questions_df['question'] != question
-            ]
-            return True
-        return False
+        """Delete a question and all related items (including every decision that uses it)"""
+        return self._cascade_delete('questions_df', question)
 
+    @_writes
     def delete_decision(self, decision):
         """Delete a decision and all related items"""
-        if decision:
-            # Get related goals
-            related_goals = self.st.session_state.goals_df[
-                self.st.session_state.goals_df['related_decision'] == decision
-            ]['goal'].tolist()
-            
-            # Delete related goals and their children
-            for goal in related_goals:
-                self.delete_goal(goal)
-            
-            # Delete the decision
-            self.st.session_state.decisions_df = self.st.session_state.decisions_df[
-                self.st.session_state.decisions_df['decision'] != decision
-            ]
-            return True
-        return False
+        return self._cascade_delete('decisions_df', decision)
 
+    @_writes
     def delete_goal(self, goal):
         """Delete a goal and all related items"""
-        if goal:
-            # Delete related tasks
-            self.st.session_state.tasks_df = self.st.session_state.tasks_df[
-                self.st.session_state.tasks_df['related_goal'] != goal
-            ]
-            
-            # Delete the goal
-            self.st.session_state.goals_df = self.st.session_state.goals_df[
-                self.st.session_state.goals_df['goal'] != goal
-            ]
-            return True
-        return False
+        return self._cascade_delete('goals_df', goal)
 
+    @_writes
     def delete_task(self, task):
         """Delete a task"""
-        if task:
-            self.st.session_state.tasks_df = self.st.session_state.tasks_df[
-                self.st.session_state.tasks_df['task'] != task
-            ]
-            return True
-        return False
+        return self._cascade_delete('tasks_df', task)
+
+    @_reads
+    def preview_delete(self, table, ref):
+        """Dry run of a delete: return {table: rows that would be removed} without mutating anything"""
+        item_id = self._resolve(table, ref)
+        if item_id is None:
+            return {}
+        return self.cascade.counts(table, [item_id])
+
+    def _cascade_delete(self, table, ref):
+        """Delete an item and its descendants with one drop per affected table"""
+        item_id = self._resolve(table, ref)
+        if item_id is None:
+            return False
+        for name, ids in self.cascade.closure(table, [item_id]).items():
+            self._drop(name, ids)
+        return True
+
+    def _resolve(self, table, ref):
+        """Return the id for ref (an id or an item's text), or None if unknown"""
+        if ref is None or ref == '':
+            return None
+        if isinstance(ref, (int, np.integer)) and not isinstance(ref, bool):
+            return int(ref) if ref in self.store.get(table).index else None
+        return self.index.first_row(table, ref)
+
+    def _resolve_list(self, table, refs):
+        """Resolve a list of refs to ids, skipping unknown ones"""
+        ids = [self._resolve(table, ref) for ref in refs]
+        return [item_id for item_id in ids if item_id is not None]
+
+    def _resolve_series(self, table, refs):
+        """Vectorized _resolve; unknown refs become NaN"""
+        if pd.api.types.is_integer_dtype(refs):
+            is_id = np.ones(len(refs), dtype=bool)
+        else:
+            is_id = np.fromiter(
+                (isinstance(ref, (int, np.integer)) and not isinstance(ref, bool) for ref in refs.tolist()),
+                dtype=bool, count=len(refs)
+            )
+        known_id = np.zeros(len(refs), dtype=bool)
+        if is_id.any():
+            known_id[is_id] = refs[is_id].isin(self.store.get(table).index).to_numpy()
+        return refs.where(known_id, refs.map(self.index.first_rows(table)))
+
+    def _append(self, table, rows):
+        """Append rows to a table under fresh ids and index them"""
+        # Cast first so rows that do not fit the schema fail before taking ids
+        DataFrameModel.enforce_schema(rows)
+        ids = self.index.allocate_ids(table, len(rows))
+        rows.index = ids
+        rows.insert(0, 'id', np.arange(ids.start, ids.stop, dtype='int64'))
+        self.store.set(table, DataFrameModel.concat(self.store.get(table), rows))
+        self.index.rows_added(table, rows)
+        self.store.mark_dirty(table, ids)
+        self.store.changes.emit(table, ids, 'add')
+        self._record('append', table, rows=rows)
+
+    def _assign(self, table, row_id, column, value):
+        """Set column to value on one row, keeping the index in sync"""
+        df = self.store.get(table)
+        self.index.value_changed(table, column, row_id, df.at[row_id, column], value)
+        # Change a shallow copy so readers holding the stored frame are
+        # unaffected (see models.data_models on copy-on-write)
+        df = df.copy(deep=False)
+        DataFrameModel.set_value(df, row_id, column, value)
+        self.store.set(table, df)
+        self.index.frame_replaced(table)
+        self.store.mark_dirty(table, [row_id])
+        self.store.changes.emit(table, [row_id], 'update')
+        self._record('assign', table, id=row_id, column=column, value=value)
+
+    def _drop(self, table, rows):
+        """Remove the rows with the given ids from a table and the index"""
+        if not rows:
+            return
+        df = self.store.get(table)
+        removed_mask = df.index.isin(rows)
+        removed = df[removed_mask]
+        self.store.set(table, df[~removed_mask])
+        self.index.rows_removed(table, removed)
+        removed_ids = removed.index.tolist()
+        self.store.mark_dirty(table, removed_ids)
+        self.store.changes.emit(table, removed_ids, 'delete')
+        self._record('drop', table, ids=removed_ids)
+
+    def _sort_todos(self):
+        # Only ever follows a change to todos_df, which has already marked it dirty
+        # Stable, so ties keep insertion order and a journal replay reproduces the same order
+        self.store.set('todos_df', self.store.get('todos_df').sort_values('importance', ascending=False, kind='stable'))
+        self.index.frame_replaced('todos_df')
+        self.store.changes.emit('todos_df', None, 'reorder')
+        self._record('sort', 'todos_df', by='importance', ascending=False)
+
+    def _record(self, op, table, **fields):
+        """Append a write to the journal, checkpointing the workspace when one is due"""
+        if self.journal is None:
+            return
+        self.journal.append(op, table, **fields)
+        if self.journal.checkpoint_due():
+            self.journal.checkpoint(self.store)
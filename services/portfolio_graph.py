@@ -0,0 +1,151 @@
+import networkx as nx
+
+class PortfolioGraph:
+    """One NetworkX DiGraph of the whole workspace, kept up to date incrementally.
+
+    Nodes have globally unique ids '<type>-<row id>' (e.g. 'goal-12'), plus a
+    'rationale-<decision id>' node per decision, and carry the same text and
+    node_type attributes as the per-decision graphs. Edges run
+    concern -> question -> decision -> goal -> task and decision -> rationale.
+
+    sync() applies the store's ChangeFeed events since the last sync, touching
+    only the rows named in them, under the store's write lock so readers never
+    see a half-applied change. It rebuilds from scratch (into a new graph
+    object, so existing views stay consistent) only when a table was replaced
+    wholesale or the feed no longer reaches back far enough.
+
+    Objects in listeners (e.g. a ReachabilityIndex) get invalidate(G, nodes)
+    before and after the edges of nodes change, and reset() after a rebuild.
+    """
+
+    # Table -> (node type, key column)
+    NODE_TABLES = {
+        'concerns_df': ('concern', 'concern'),
+        'questions_df': ('question', 'question'),
+        'decisions_df': ('decision', 'decision'),
+        'goals_df': ('goal', 'goal'),
+        'tasks_df': ('task', 'task')
+    }
+
+    def __init__(self, pipeline_service):
+        self.pipeline_service = pipeline_service
+        self.graph = nx.DiGraph()
+        self.version = None
+        self.listeners = []
+
+    @staticmethod
+    def node_id(node_type, row_id):
+        """Global node id for a row (or a decision's rationale)"""
+        return f"{node_type}-{row_id}"
+
+    def sync(self):
+        """Apply the workspace changes since the last sync and return the graph"""
+        store = self.pipeline_service.store
+        if self.version == store.changes.version:
+            return self.graph
+        with store.writing():
+            events = None if self.version is None else store.changes.since(self.version)
+            if events is None or any(
+                event.key is None and event.table in self.NODE_TABLES for event in events
+            ):
+                self._rebuild()
+            else:
+                self._apply(events)
+            self.version = store.changes.version
+        return self.graph
+
+    def _rebuild(self):
+        G = nx.DiGraph()
+        store = self.pipeline_service.store
+        for table in self.NODE_TABLES:
+            df = store.get(table)
+            self._add_rows(G, table, df.index.tolist(), df)
+        self.graph = G
+        for listener in self.listeners:
+            listener.reset()
+
+    def _apply(self, events):
+        """Apply events in order, one row lookup per (version, table)"""
+        store = self.pipeline_service.store
+        G = self.graph
+        start = 0
+        while start < len(events):
+            # Events of one version share a table and an operation
+            end = start
+            while end < len(events) and events[end].version == events[start].version:
+                end += 1
+            table, op = events[start].table, events[start].op
+            keys = [event.key for event in events[start:end]]
+            start = end
+
+            if table not in self.NODE_TABLES:
+                continue
+            node_type = self.NODE_TABLES[table][0]
+            if op == 'delete':
+                nodes = [self.node_id(node_type, key) for key in keys]
+                self._notify(G, nodes)
+                G.remove_nodes_from(nodes)
+                if table == 'decisions_df':
+                    G.remove_nodes_from(self.node_id('rationale', key) for key in keys)
+            elif op in ('add', 'update'):
+                df = store.get(table)
+                # Rows deleted again by a later event are skipped here and removed by it
+                ids = df.index.intersection(keys).tolist()
+                nodes = [self.node_id(node_type, row_id) for row_id in ids]
+                self._notify(G, nodes)
+                self._add_rows(G, table, ids, df)
+                self._notify(G, nodes)
+
+    def _notify(self, G, nodes):
+        """Tell listeners the edges of nodes are about to change or just changed"""
+        if self.listeners:
+            present = [node for node in nodes if node in G]
+            for listener in self.listeners:
+                listener.invalidate(G, present)
+
+    def _add_rows(self, G, table, ids, df):
+        """Add or refresh the nodes for ids and their edges from parent nodes"""
+        if not ids:
+            return
+        node_type, key_column = self.NODE_TABLES[table]
+        rows = df.loc[ids]
+        label = node_type.capitalize()
+        nodes = [self.node_id(node_type, row_id) for row_id in ids]
+
+        if table == 'tasks_df':
+            texts = [
+                f"Task:\n{task}\nAssignee: {assignee}"
+                for task, assignee in zip(rows['task'].tolist(), rows['assignee'].tolist())
+            ]
+        else:
+            texts = [f"{label}:\n{text}" for text in rows[key_column].tolist()]
+        for node, row_id, text in zip(nodes, ids, texts):
+            if node in G:
+                # Parents may have changed; drop the old incoming edges
+                G.remove_edges_from([
+                    (parent, node) for parent in list(G.predecessors(node))
+                ])
+            G.add_node(node, text=text, node_type=node_type, id=row_id)
+
+        if table == 'questions_df':
+            parents = [[self.node_id('concern', c)] for c in rows['concern_id'].tolist()]
+        elif table == 'decisions_df':
+            parents = [[self.node_id('question', q) for q in qs] for qs in rows['question_ids'].tolist()]
+            for node, row_id, rationale in zip(nodes, ids, rows['rationale'].tolist()):
+                r_node = self.node_id('rationale', row_id)
+                G.add_node(r_node, text=f"Rationale:\n{rationale}", node_type='rationale', id=row_id)
+                G.add_edge(node, r_node)
+        elif table == 'goals_df':
+            parents = [[self.node_id('decision', d)] for d in rows['decision_id'].tolist()]
+        elif table == 'tasks_df':
+            parents = [[self.node_id('goal', g)] for g in rows['goal_id'].tolist()]
+        else:
+            parents = None
+
+        if parents is not None:
+            # Skip references to missing parents rather than creating bare nodes
+            G.add_edges_from(
+                (parent, node)
+                for node, node_parents in zip(nodes, parents)
+                for parent in node_parents if parent in G
+            )
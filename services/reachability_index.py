@@ -0,0 +1,72 @@
+class ReachabilityIndex:
+    """Transitive closure of the portfolio graph, grouped by node type.
+
+    For a node it gives every row id of each type that it reaches (its
+    downstream impact) or that reaches it (its upstream lineage), e.g. all
+    tasks under a concern. A node's closure is the union of its neighbours'
+    closures; it is computed on first use, memoized, and kept valid
+    incrementally: PortfolioGraph calls invalidate() around every node it
+    changes, which drops only the cached closures that depend on it.
+
+    Because a closure is only ever cached after its neighbours' closures,
+    a node whose closure is not cached has no cached closure beyond it, so
+    invalidation stops as soon as it meets an uncached node.
+
+    Each closure maps node type -> frozenset of row ids, so a query for one
+    type costs time proportional to the size of its answer. Rationale nodes
+    are not items and are left out.
+    """
+
+    def __init__(self, portfolio):
+        self.portfolio = portfolio
+        self._down = {}
+        self._up = {}
+        portfolio.listeners.append(self)
+
+    def descendants(self, node):
+        """Return {node type: frozenset of row ids} reachable from node"""
+        return self._closure(node, self._down, self.portfolio.graph.successors)
+
+    def ancestors(self, node):
+        """Return {node type: frozenset of row ids} that reach node"""
+        return self._closure(node, self._up, self.portfolio.graph.predecessors)
+
+    def invalidate(self, G, nodes):
+        """Forget closures that may change with the edges of nodes in G"""
+        self._drop(G, nodes, self._down, G.predecessors)
+        self._drop(G, nodes, self._up, G.successors)
+
+    def reset(self):
+        """Forget every closure, e.g. after the graph was rebuilt"""
+        self._down = {}
+        self._up = {}
+
+    def _closure(self, node, cache, neighbours):
+        cached = cache.get(node)
+        if cached is not None:
+            return cached
+        G = self.portfolio.graph
+        closure = {}
+        for neighbour in neighbours(node):
+            attributes = G.nodes[neighbour]
+            if attributes['node_type'] == 'rationale':
+                continue
+            closure.setdefault(attributes['node_type'], set()).add(attributes['id'])
+            for node_type, ids in self._closure(neighbour, cache, neighbours).items():
+                closure.setdefault(node_type, set()).update(ids)
+        closure = {node_type: frozenset(ids) for node_type, ids in closure.items()}
+        cache[node] = closure
+        return closure
+
+    @staticmethod
+    def _drop(G, nodes, cache, neighbours):
+        """Drop the cached closures of nodes and, transitively, of the nodes whose closure includes them"""
+        # Always step past the changed nodes themselves: a new edge can make a
+        # cached neighbour depend on a node that has nothing cached yet
+        stack = [n for node in nodes for n in neighbours(node)]
+        for node in nodes:
+            cache.pop(node, None)
+        while stack:
+            node = stack.pop()
+            if cache.pop(node, None) is not None:
+                stack.extend(neighbours(node))
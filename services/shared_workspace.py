@@ -0,0 +1,91 @@
+import threading
+from contextlib import contextmanager
+from services.workspace_store import InMemoryStore
+
+class ReadWriteLock:
+    """Many readers or one writer at a time, preferring waiting writers.
+
+    Both sides are reentrant per thread, and a thread holding the write lock
+    may also read, so a writing PipelineService method can call reading ones.
+    Upgrading a read lock to a write lock is not supported.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = None
+        self._write_depth = 0
+        self._writers_waiting = 0
+        self._local = threading.local()
+
+    @contextmanager
+    def reading(self):
+        depth = getattr(self._local, 'read_depth', 0)
+        if depth or self._writer == threading.get_ident():
+            # Already inside a read or write on this thread
+            self._local.read_depth = depth + 1
+            try:
+                yield
+            finally:
+                self._local.read_depth = depth
+            return
+
+        with self._cond:
+            while self._writer is not None or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        self._local.read_depth = 1
+        try:
+            yield
+        finally:
+            self._local.read_depth = 0
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def writing(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+            else:
+                if getattr(self._local, 'read_depth', 0):
+                    raise RuntimeError("Cannot take the write lock while holding the read lock")
+                self._writers_waiting += 1
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+                self._writers_waiting -= 1
+                self._writer = me
+                self._write_depth = 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._write_depth -= 1
+                if not self._write_depth:
+                    self._writer = None
+                    self._cond.notify_all()
+
+
+class SharedWorkspaceStore(InMemoryStore):
+    """One workspace shared by every Streamlit session in the process.
+
+    Cached with st.cache_resource, so memory does not grow with the number
+    of viewers and every session sees the others' edits on its next rerun.
+    Stored DataFrames are never modified in place (PipelineService replaces
+    a table to change it), so get() hands out the shared frame itself as a
+    free read-only view; reading()/writing() make multi-table reads and
+    writes atomic.
+    """
+
+    def __init__(self, frames=None):
+        super().__init__(frames)
+        self._lock = ReadWriteLock()
+
+    def reading(self):
+        return self._lock.reading()
+
+    def writing(self):
+        return self._lock.writing()
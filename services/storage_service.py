@@ -1,68 +1,276 @@
 import pandas as pd
 from models.data_models import DataFrameModel
 import ast
+import json
+import os
+import openpyxl
 
 class StorageService:
+    TABLE_NAMES = ['concerns_df', 'questions_df', 'decisions_df', 'goals_df', 'tasks_df', 'todos_df']
+
+    # Table name -> Excel sheet name
+    EXCEL_SHEETS = {
+        'concerns_df': 'Concerns',
+        'questions_df': 'Questions',
+        'decisions_df': 'Decisions',
+        'goals_df': 'Goals',
+        'tasks_df': 'Tasks',
+        'todos_df': 'Todos'
+    }
+
+    # Columns holding Python lists
+    LIST_COLUMNS = {'decisions_df': ['question_ids'], 'todos_df': ['categories']}
+
     def __init__(self):
         self.model = DataFrameModel()
-    
-    def initialize_dataframes(self, st):
-        """Initialize all dataframes in Streamlit session state"""
-        if 'concerns_df' not in st.session_state:
-            st.session_state.concerns_df = self.model.create_concerns_df()
-        if 'questions_df' not in st.session_state:
-            st.session_state.questions_df = self.model.create_questions_df()
-        if 'decisions_df' not in st.session_state:
-            st.session_state.decisions_df = self.model.create_decisions_df()
-        if 'goals_df' not in st.session_state:
-            st.session_state.goals_df = self.model.create_goals_df()
-        if 'tasks_df' not in st.session_state:
-            st.session_state.tasks_df = self.model.create_tasks_df()
-        if 'todos_df' not in st.session_state:
-            st.session_state.todos_df = self.model.create_todos_df()
-
-    def save_to_excel(self, st, filename='decision_pipeline.xlsx'):
-        """Save all dataframes to Excel"""
+
+    def initialize_dataframes(self, store):
+        """Initialize all dataframes in the workspace store"""
+        with store.writing():
+            for name in self.TABLE_NAMES:
+                if name not in store:
+                    store.set(name, getattr(self.model, f'create_{name[:-3]}_df')())
+                    store.changes.emit(name, None, 'replace')
+
+    def save_to_excel(self, store, filename='decision_pipeline.xlsx', progress=None):
+        """Save all dataframes to Excel, skipping the save if nothing changed; returns the tables written"""
+        target = self._save_target('excel', filename)
+        if not self._tables_to_write(store, target, lambda name: os.path.exists(filename)):
+            return []
+
+        names = [name for name in self.TABLE_NAMES if name in store]
         with pd.ExcelWriter(filename) as writer:
-            st.session_state.concerns_df.to_excel(writer, sheet_name='Concerns', index=False)
-            st.session_state.questions_df.to_excel(writer, sheet_name='Questions', index=False)
-            
-            # Handle decisions_df with list column
-            decisions_df = st.session_state.decisions_df.copy()
-            decisions_df['related_questions'] = decisions_df['related_questions'].apply(str)
-            decisions_df.to_excel(writer, sheet_name='Decisions', index=False)
-            
-            st.session_state.goals_df.to_excel(writer, sheet_name='Goals', index=False)
-            st.session_state.tasks_df.to_excel(writer, sheet_name='Tasks', index=False)
-            
-            if 'todos_df' in st.session_state:
-                # Handle todos_df with list column
-                todos_df = st.session_state.todos_df.copy()
-                todos_df['categories'] = todos_df['categories'].apply(str)
-                todos_df.to_excel(writer, sheet_name='Todos', index=False)
-    
-    def load_from_excel(self, st, filename='decision_pipeline.xlsx'):
+            for i, name in enumerate(names):
+                if progress:
+                    progress(0.9 * i / len(names), f"Writing {self.EXCEL_SHEETS[name]}...")
+                df = store.get(name)
+                # Stringify list columns on a shallow copy instead of copying the table
+                df = df.assign(**{column: df[column].map(str) for column in self.LIST_COLUMNS.get(name, ())})
+                df.to_excel(writer, sheet_name=self.EXCEL_SHEETS[name], index=False)
+            if progress:
+                # Closing the writer zips and writes the workbook
+                progress(0.9, "Compressing workbook...")
+        store.mark_saved(target)
+        return names
+
+    def load_from_excel(self, store, filename='decision_pipeline.xlsx', progress=None):
         """Load all dataframes from Excel"""
-        st.session_state.concerns_df = pd.read_excel(filename, sheet_name='Concerns')
-        st.session_state.questions_df = pd.read_excel(filename, sheet_name='Questions')
-        
-        # Handle decisions_df with list column
-        decisions_df = pd.read_excel(filename, sheet_name='Decisions')
-        decisions_df['related_questions'] = decisions_df['related_questions'].apply(
-            lambda x: ast.literal_eval(x) if isinstance(x, str) else x
-        )
-        st.session_state.decisions_df = decisions_df
-        
-        st.session_state.goals_df = pd.read_excel(filename, sheet_name='Goals')
-        st.session_state.tasks_df = pd.read_excel(filename, sheet_name='Tasks')
-        
+        frames = self.read_excel_frames(filename, progress)
+        with store.writing():
+            for name, df in frames.items():
+                store.set(name, df)
+                store.changes.emit(name, None, 'replace')
+            store.mark_saved(self._save_target('excel', filename))
+
+    def load_frames(self, store, frames):
+        """Put previously parsed frames into the store, copying so cached originals stay untouched"""
+        with store.writing():
+            for name, df in frames.items():
+                store.set(name, df.copy())
+                store.changes.emit(name, None, 'replace')
+            # The frames came from elsewhere, so the next save writes every table
+            store.mark_saved(None)
+
+    def read_excel_frames(self, filename, progress=None, chunk_size=10000):
+        """Parse a workbook into a dict of table name -> DataFrame without touching a store"""
+        workbook = openpyxl.load_workbook(filename, read_only=True, data_only=True)
         try:
-            # Handle todos_df with list column
-            todos_df = pd.read_excel(filename, sheet_name='Todos')
-            todos_df['categories'] = todos_df['categories'].apply(
-                lambda x: ast.literal_eval(x) if isinstance(x, str) else x
-            )
-            st.session_state.todos_df = todos_df
-        except ValueError:
+            missing = [
+                sheet_name for name, sheet_name in self.EXCEL_SHEETS.items()
+                if name != 'todos_df' and sheet_name not in workbook.sheetnames
+            ]
+            if missing:
+                raise ValueError(f"Workbook is missing sheets: {', '.join(missing)}")
+            sheets = [
+                (name, workbook[sheet_name]) for name, sheet_name in self.EXCEL_SHEETS.items()
+                if sheet_name in workbook.sheetnames
+            ]
+            total_rows = sum(max((sheet.max_row or 1) - 1, 0) for _, sheet in sheets) or 1
+            frames = {}
+            rows_read = 0
+            for name, sheet in sheets:
+                chunks = []
+                for chunk in self._read_sheet_chunks(sheet, chunk_size):
+                    chunks.append(chunk)
+                    rows_read += len(chunk)
+                    if progress:
+                        progress(min(rows_read / total_rows, 1.0), f"Reading {sheet.title}...")
+                frames[name] = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+        finally:
+            workbook.close()
+
+        if 'todos_df' not in frames:
             # If Todos sheet doesn't exist in older files, create empty DataFrame
-            st.session_state.todos_df = self.model.create_todos_df()
+            frames['todos_df'] = self.model.create_todos_df()
+
+        # Handle list columns (question ids, or question text in older files)
+        decisions_df = frames['decisions_df']
+        list_column = 'question_ids' if 'question_ids' in decisions_df else 'related_questions'
+        decisions_df[list_column] = self._decode_list_column(decisions_df[list_column])
+        frames['todos_df']['categories'] = self._decode_list_column(frames['todos_df']['categories'])
+
+        if 'id' not in frames['concerns_df']:
+            frames = self._migrate_text_keys(frames)
+
+        if progress:
+            progress(1.0, "Workbook loaded")
+        return {name: self._label_by_id(frames[name]) for name in self.TABLE_NAMES}
+
+    @staticmethod
+    def _read_sheet_chunks(sheet, chunk_size):
+        """Yield a sheet's data rows as DataFrames of at most chunk_size rows"""
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            yield pd.DataFrame()
+            return
+        # Read-only sheets can report trailing empty header cells
+        columns = [column for column in header if column is not None]
+
+        chunk = []
+        yielded = False
+        for row in rows:
+            chunk.append(row[:len(columns)])
+            if len(chunk) == chunk_size:
+                yield pd.DataFrame(chunk, columns=columns)
+                yielded = True
+                chunk = []
+        if chunk or not yielded:
+            yield pd.DataFrame(chunk, columns=columns)
+
+    @staticmethod
+    def _decode_list_column(series):
+        """Decode a column of str()-encoded lists, each distinct string once"""
+        codes, uniques = pd.factorize(series.map(lambda x: x if isinstance(x, str) else None))
+        uniques = list(uniques)
+        try:
+            decoded = json.loads('[' + ','.join(uniques) + ']')
+        except ValueError:
+            decoded = [ast.literal_eval(value) for value in uniques]
+        return [list(decoded[code]) if code >= 0 else [] for code in codes]
+
+    def save_to_columnar(self, store, directory='decision_pipeline', file_format='parquet', progress=None):
+        """Save changed dataframes to one Parquet or Feather file each in directory; returns the tables written"""
+        pa, write_table, _ = self._columnar_io(file_format)
+        target = self._save_target(file_format, directory)
+        names = self._tables_to_write(
+            store, target,
+            lambda name: os.path.exists(self._columnar_path(directory, name, file_format))
+        )
+        os.makedirs(directory, exist_ok=True)
+        for i, name in enumerate(names):
+            if progress:
+                progress(i / len(names), f"Writing {name[:-3]}...")
+            table = pa.Table.from_pandas(store.get(name), preserve_index=False)
+            write_table(table, self._columnar_path(directory, name, file_format))
+        store.mark_saved(target)
+        return names
+
+    def load_from_columnar(self, store, directory='decision_pipeline', file_format='parquet'):
+        """Load all dataframes saved by save_to_columnar"""
+        frames = self.read_columnar_frames(directory, file_format)
+        with store.writing():
+            for name, df in frames.items():
+                store.set(name, df)
+                store.changes.emit(name, None, 'replace')
+            store.mark_saved(self._save_target(file_format, directory))
+
+    def read_columnar_frames(self, directory, file_format='parquet'):
+        """Read the per-table Parquet or Feather files in directory into a dict of DataFrames"""
+        _, _, read_table = self._columnar_io(file_format)
+        frames = {}
+        for name in self.TABLE_NAMES:
+            path = self._columnar_path(directory, name, file_format)
+            if not os.path.exists(path):
+                frames[name] = getattr(self.model, f'create_{name[:-3]}_df')()
+                continue
+            table = read_table(path)
+            df = table.to_pandas()
+            for column in self.LIST_COLUMNS.get(name, ()):
+                # to_pandas gives numpy arrays for list cells; to_pylist gives plain lists
+                df[column] = table.column(column).to_pylist()
+            frames[name] = self._label_by_id(df)
+        return frames
+
+    def _tables_to_write(self, store, target, exists):
+        """Return the tables a save to target must write: all of them, or only the dirty or missing ones"""
+        names = [name for name in self.TABLE_NAMES if name in store]
+        if target is None or store.saved_to() != target:
+            return names
+        dirty = set(store.dirty_tables())
+        return [name for name in names if name in dirty or not exists(name)]
+
+    @staticmethod
+    def _save_target(file_format, path):
+        """Identify a save location; None for file objects, which are always written in full"""
+        if isinstance(path, (str, os.PathLike)):
+            return (file_format, os.path.abspath(path))
+        return None
+
+    @staticmethod
+    def _columnar_io(file_format):
+        """Return (pyarrow, write_table, read_table) for 'parquet' or 'feather'"""
+        try:
+            import pyarrow as pa
+            import pyarrow.feather as feather
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet/Feather storage requires the 'pyarrow' package") from e
+
+        if file_format == 'parquet':
+            return pa, pq.write_table, pq.read_table
+        if file_format == 'feather':
+            return pa, feather.write_feather, feather.read_table
+        raise ValueError(f"Unknown columnar format: {file_format}")
+
+    @staticmethod
+    def _columnar_path(directory, name, file_format):
+        return os.path.join(directory, f"{name[:-3]}.{file_format}")
+
+    def _migrate_text_keys(self, frames):
+        """Convert a workbook saved before integer ids, mapping text references to the first matching id"""
+        for df in frames.values():
+            if 'id' not in df:
+                df.insert(0, 'id', range(len(df)))
+
+        def ids_by_text(df, column):
+            first = df.drop_duplicates(column)
+            return dict(zip(first[column], first['id']))
+
+        def replace_reference(df, column, parents, id_column):
+            ids = df[column].map(parents).fillna(self.model.MISSING_ID).astype('int64')
+            df.insert(df.columns.get_loc(column), id_column, ids)
+            return df.drop(columns=[column])
+
+        concern_ids = ids_by_text(frames['concerns_df'], 'concern')
+        question_ids = ids_by_text(frames['questions_df'], 'question')
+        decision_ids = ids_by_text(frames['decisions_df'], 'decision')
+        goal_ids = ids_by_text(frames['goals_df'], 'goal')
+
+        frames['questions_df'] = replace_reference(
+            frames['questions_df'], 'related_concern', concern_ids, 'concern_id'
+        )
+        frames['goals_df'] = replace_reference(
+            frames['goals_df'], 'related_decision', decision_ids, 'decision_id'
+        )
+        frames['tasks_df'] = replace_reference(
+            frames['tasks_df'], 'related_goal', goal_ids, 'goal_id'
+        )
+
+        decisions_df = frames['decisions_df']
+        decisions_df['related_questions'] = decisions_df['related_questions'].apply(
+            lambda questions: [question_ids[q] for q in questions if q in question_ids]
+        )
+        frames['decisions_df'] = decisions_df.rename(columns={'related_questions': 'question_ids'})
+        return frames
+
+    @staticmethod
+    def _label_by_id(df):
+        """Cast to the DataFrameModel schema and use the id column as the row labels, as PipelineService expects"""
+        # Cells of a text column can hold numbers, which Arrow cannot store next to strings
+        for column in DataFrameModel.TEXT_COLUMNS:
+            if column in df:
+                df[column] = df[column].map(lambda value: '' if pd.isna(value) else str(value))
+        DataFrameModel.enforce_schema(df)
+        df.index = df['id'].to_numpy()
+        return df
@@ -0,0 +1,36 @@
+from collections import OrderedDict
+import hashlib
+import threading
+
+class UploadCache:
+    """Bounded LRU cache of parsed workbooks keyed by a hash of their content.
+
+    Re-uploading a workbook that was already parsed (by any session) reuses the
+    cached frames instead of parsing the file again.
+    """
+
+    def __init__(self, max_entries=8):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(data):
+        """Return the content hash used as the cache key for raw file bytes"""
+        return hashlib.sha256(data).hexdigest()
+
+    def get(self, fingerprint):
+        """Return the cached frames for fingerprint, or None"""
+        with self._lock:
+            frames = self._entries.get(fingerprint)
+            if frames is not None:
+                self._entries.move_to_end(fingerprint)
+            return frames
+
+    def put(self, fingerprint, frames):
+        """Cache frames under fingerprint, evicting the least recently used entry if full"""
+        with self._lock:
+            self._entries[fingerprint] = frames
+            self._entries.move_to_end(fingerprint)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
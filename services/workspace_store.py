@@ -0,0 +1,118 @@
+from contextlib import nullcontext
+from services.change_feed import ChangeFeed
+
+class WorkspaceStore:
+    """Interface for the place the pipeline DataFrames live.
+
+    Services read and write tables by name (e.g. 'concerns_df') through a store
+    instead of touching st.session_state, so they can run inside a Streamlit
+    session, a batch worker or a profiling harness alike.
+    """
+
+    def get(self, name):
+        """Return the DataFrame stored under name"""
+        raise NotImplementedError("Subclasses must implement get method")
+
+    def set(self, name, df):
+        """Store df under name, replacing any previous DataFrame"""
+        raise NotImplementedError("Subclasses must implement set method")
+
+    def __contains__(self, name):
+        raise NotImplementedError("Subclasses must implement __contains__ method")
+
+    def reading(self):
+        """Context manager held while reading several tables as one consistent state"""
+        return nullcontext()
+
+    def writing(self):
+        """Context manager held while changing tables; excludes readers and other writers"""
+        return nullcontext()
+
+    @property
+    def changes(self):
+        """This workspace's ChangeFeed: its version and what changed at each version"""
+        log = self._change_log()
+        if 'feed' not in log:
+            log['feed'] = ChangeFeed()
+        return log['feed']
+
+    def mark_dirty(self, name, ids):
+        """Record that the rows with the given ids in table name changed since the last save"""
+        self._change_log()['tables'].setdefault(name, set()).update(ids)
+
+    def dirty_tables(self):
+        """Return the names of tables changed since the last save"""
+        return list(self._change_log()['tables'])
+
+    def unsaved_changes(self):
+        """Return the number of rows added, edited or deleted since the last save"""
+        return sum(len(ids) for ids in self._change_log()['tables'].values())
+
+    def saved_to(self):
+        """Return the target of the last save or load, or None"""
+        return self._change_log()['saved_to']
+
+    def mark_saved(self, target=None):
+        """Forget all changes; the tables now match target (a save or load location)"""
+        log = self._change_log()
+        # A new generation: change tracking handed out before this no longer applies
+        log.update(tables={}, saved_to=target, generation=log.get('generation', 0) + 1)
+
+    def snapshot(self, names):
+        """Return an InMemoryStore holding shallow copies of the named tables.
+
+        This store's unsaved changes move to the snapshot, so saving the
+        snapshot (e.g. on a background thread) clears them; merge_changes
+        brings back whatever the save left unsaved.
+        """
+        with self.writing():
+            snapshot = InMemoryStore({name: self.get(name).copy(deep=False) for name in names if name in self})
+            log = self._change_log()
+            snapshot._changes = {
+                'tables': log['tables'],
+                'saved_to': log['saved_to'],
+                'source_generation': log.get('generation', 0)
+            }
+            log['tables'] = {}
+        return snapshot
+
+    def merge_changes(self, other):
+        """Take over other's unsaved changes and save target, keeping changes made here since.
+
+        Ignored if this store was saved or loaded after other was snapshotted:
+        its tables no longer descend from other's, so neither other's changes
+        nor its save target describe them.
+        """
+        with self.writing():
+            log = self._change_log()
+            other_log = other._change_log()
+            if other_log.get('source_generation') != log.get('generation', 0):
+                return
+            for name, ids in other_log['tables'].items():
+                log['tables'].setdefault(name, set()).update(ids)
+            log['saved_to'] = other.saved_to()
+
+    def _change_log(self):
+        """Return the mutable {'tables': {name: ids}, 'saved_to': target, 'generation': n} dict for this store"""
+        raise NotImplementedError("Subclasses must implement _change_log method")
+
+
+class InMemoryStore(WorkspaceStore):
+    """Plain dictionary-backed store for headless use"""
+
+    def __init__(self, frames=None):
+        self._frames = dict(frames or {})
+        self._changes = {'tables': {}, 'saved_to': None, 'generation': 0}
+
+    def get(self, name):
+        return self._frames[name]
+
+    def set(self, name, df):
+        self._frames[name] = df
+
+    def __contains__(self, name):
+        return name in self._frames
+
+    def _change_log(self):
+        return self._changes
+
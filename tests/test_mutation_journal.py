@@ -0,0 +1,24 @@
+from services.mutation_journal import MutationJournal
+from services.storage_service import StorageService
+from services.workspace_store import InMemoryStore
+
+
+def test_failed_checkpoint_keeps_writer_running(tmp_path, monkeypatch):
+    journal = MutationJournal(str(tmp_path), delay=0)
+    store = InMemoryStore()
+    StorageService().initialize_dataframes(store)
+
+    def fail(*args, **kwargs):
+        raise TypeError("cannot write mixed column")
+
+    monkeypatch.setattr(journal.storage, 'save_to_columnar', fail)
+    journal.append('drop', 'concerns_df', ids=[1])
+    journal.checkpoint(store)
+    journal.flush()
+    assert isinstance(journal.error, TypeError)
+
+    journal.append('drop', 'concerns_df', ids=[2])
+    journal.flush()
+    assert journal._writer.is_alive()
+    assert [entry['ids'] for entry in journal._read_entries(0)] == [[1], [2]]
+    journal.close()
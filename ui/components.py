@@ -39,10 +39,11 @@ class Sidebar:
         st.subheader("Add Question")
         with st.form(key="question_form"):
             question = st.text_input("New Question")
-            concerns = st.session_state.concerns_df['concern'].tolist()
+            concerns = self.pipeline_service.get_names('concerns_df')
             selected_concern = st.selectbox(
                 "Related Concern",
-                concerns if concerns else ['']
+                list(concerns) if concerns else [''],
+                format_func=lambda concern_id: concerns.get(concern_id, '')
             )
             urgency = st.slider(
                 "Urgency",
@@ -53,7 +54,7 @@ class Sidebar:
                 key="question_urgency"
             )
             submit = st.form_submit_button("Add Question")
-            if submit and question and selected_concern and selected_concern != '':
+            if submit and question and selected_concern != '':
                 if self.pipeline_service.add_question(question, selected_concern, urgency):
                     st.success("Question added successfully!")
                     st.rerun()
@@ -64,12 +65,13 @@ class Sidebar:
         with st.form(key="decision_form"):
             decision = st.text_input("New Decision")
             rationale = st.text_area("Rationale")
-            questions = st.session_state.questions_df['question'].tolist()
+            questions = self.pipeline_service.get_names('questions_df')
             
             # Changed to multiselect for multiple question selection
             selected_questions = st.multiselect(
                 "Related Questions",
-                questions if questions else []
+                list(questions),
+                format_func=questions.get
             )
             
             urgency = st.slider(
@@ -91,10 +93,11 @@ class Sidebar:
         st.subheader("Add Goal")
         with st.form(key="goal_form"):
             goal = st.text_input("New Goal")
-            decisions = st.session_state.decisions_df['decision'].tolist()
+            decisions = self.pipeline_service.get_names('decisions_df')
             selected_decision = st.selectbox(
                 "Related Decision",
-                decisions if decisions else ['']
+                list(decisions) if decisions else [''],
+                format_func=lambda decision_id: decisions.get(decision_id, '')
             )
             urgency = st.slider(
                 "Urgency",
@@ -123,10 +126,11 @@ class Sidebar:
         with st.form(key="task_form"):
             task = st.text_input("New Task")
             assignee = st.text_input("Assignee")
-            goals = st.session_state.goals_df['goal'].tolist()
+            goals = self.pipeline_service.get_names('goals_df')
             selected_goal = st.selectbox(
                 "Related Goal",
-                goals if goals else ['']
+                list(goals) if goals else [''],
+                format_func=lambda goal_id: goals.get(goal_id, '')
             )
             urgency = st.slider(
                 "Urgency",
@@ -137,7 +141,7 @@ class Sidebar:
                 key="task_urgency"
             )
             submit = st.form_submit_button("Add Task")
-            if submit and task and assignee and selected_goal and selected_goal != '':
+            if submit and task and assignee and selected_goal != '':
                 if self.pipeline_service.add_task(task, assignee, selected_goal, urgency):
                     st.success("Task added successfully!")
                     st.rerun()
@@ -31,169 +31,174 @@ class EntryManager:
             self._manage_todos()
 
     def _manage_concerns(self):
-        concerns = st.session_state.concerns_df['concern'].tolist()
+        concerns = self.pipeline_service.get_names('concerns_df')
         if concerns:
-            selected_concern = st.selectbox("Select Concern to Manage", concerns, key="manage_concern")
+            selected_concern = st.selectbox(
+                "Select Concern to Manage", list(concerns), format_func=concerns.get, key="manage_concern"
+            )
+            concern_text = concerns[selected_concern]
             
             col1, col2 = st.columns(2)
             with col1:
                 if st.button("Delete Concern", key="delete_concern"):
                     if self.pipeline_service.delete_concern(selected_concern):
-                        st.success(f"Deleted concern '{selected_concern}' and all related items")
+                        st.success(f"Deleted concern '{concern_text}' and all related items")
             
             with col2:
-                new_concern = st.text_input("New Concern Text", value=selected_concern, key="edit_concern")
+                new_concern = st.text_input("New Concern Text", value=concern_text, key="edit_concern")
                 if st.button("Update Concern", key="update_concern"):
                     if self.pipeline_service.update_concern(selected_concern, new_concern):
                         st.success(f"Updated concern to '{new_concern}'")
 
     def _manage_questions(self):
-        questions = st.session_state.questions_df['question'].tolist()
+        questions = self.pipeline_service.get_names('questions_df')
         if questions:
-            selected_question = st.selectbox("Select Question to Manage", questions, key="manage_question")
+            selected_question = st.selectbox(
+                "Select Question to Manage", list(questions), format_func=questions.get, key="manage_question"
+            )
             
             col1, col2 = st.columns(2)
             with col1:
                 if st.button("Delete Question", key="delete_question"):
                     if self.pipeline_service.delete_question(selected_question):
-                        st.success(f"Deleted question '{selected_question}' and all related items")
+                        st.success(f"Deleted question '{questions[selected_question]}' and all related items")
             
             with col2:
-                question_data = st.session_state.questions_df[
-                    st.session_state.questions_df['question'] == selected_question
-                ].iloc[0]
+                question_data = self.pipeline_service.get_item('questions_df', selected_question)
                 
-                new_question = st.text_input("New Question Text", value=selected_question, key="edit_question")
+                new_question = st.text_input("New Question Text", value=question_data['question'], key="edit_question")
                 
                 # Check if there are any concerns before creating the selectbox
-                if not st.session_state.concerns_df.empty:
+                concerns = self.pipeline_service.get_names('concerns_df')
+                if concerns:
+                    concern_ids = list(concerns)
                     new_concern = st.selectbox(
                         "Related Concern",
-                        st.session_state.concerns_df['concern'].tolist(),
-                        index=st.session_state.concerns_df['concern'].tolist().index(question_data['related_concern'])
+                        concern_ids,
+                        format_func=concerns.get,
+                        index=concern_ids.index(question_data['concern_id']) if question_data['concern_id'] in concerns else 0
                     )
                 else:
                     st.warning("No concerns available. Please add concerns first.")
                     new_concern = None
                 
-                if st.button("Update Question", key="update_question") and new_concern:
+                if st.button("Update Question", key="update_question") and new_concern is not None:
                     if self.pipeline_service.update_question(selected_question, new_question, new_concern):
                         st.success(f"Updated question to '{new_question}'")
 
     def _manage_decisions(self):
-        decisions = st.session_state.decisions_df['decision'].tolist()
+        decisions = self.pipeline_service.get_names('decisions_df')
         if decisions:
-            selected_decision = st.selectbox("Select Decision to Manage", decisions, key="manage_decision")
+            selected_decision = st.selectbox(
+                "Select Decision to Manage", list(decisions), format_func=decisions.get, key="manage_decision"
+            )
             
             col1, col2 = st.columns(2)
             with col1:
                 if st.button("Delete Decision", key="delete_decision"):
                     if self.pipeline_service.delete_decision(selected_decision):
-                        st.success(f"Deleted decision '{selected_decision}' and all related items")
+                        st.success(f"Deleted decision '{decisions[selected_decision]}' and all related items")
             
             with col2:
-                decision_data = st.session_state.decisions_df[
-                    st.session_state.decisions_df['decision'] == selected_decision
-                ].iloc[0]
+                decision_data = self.pipeline_service.get_item('decisions_df', selected_decision)
                 
-                new_decision = st.text_input("New Decision Text", value=selected_decision, key="edit_decision")
+                new_decision = st.text_input("New Decision Text", value=decision_data['decision'], key="edit_decision")
                 new_rationale = st.text_area("New Rationale", value=decision_data.get('rationale', ''), key="edit_rationale")
                 
-                # Check if there are any questions before creating the selectbox
-                if not st.session_state.questions_df.empty:
-                    questions_list = st.session_state.questions_df['question'].tolist()
-                    related_question = decision_data.get('related_question')
-                    if related_question in questions_list:
-                        question_index = questions_list.index(related_question)
-                    else:
-                        question_index = 0
-                    
-                    new_question = st.selectbox(
-                        "Related Question",
-                        questions_list,
-                        index=question_index
+                # Check if there are any questions before creating the multiselect
+                questions = self.pipeline_service.get_names('questions_df')
+                if questions:
+                    new_questions = st.multiselect(
+                        "Related Questions",
+                        list(questions),
+                        format_func=questions.get,
+                        default=[q for q in decision_data['question_ids'] if q in questions]
                     )
                 else:
                     st.warning("No questions available. Please add questions first.")
-                    new_question = None
+                    new_questions = None
                 
-                if st.button("Update Decision", key="update_decision") and new_question:
+                if st.button("Update Decision", key="update_decision") and new_questions:
                     if self.pipeline_service.update_decision(
-                        selected_decision, new_decision, new_rationale, new_question
+                        selected_decision, new_decision, new_rationale, new_questions
                     ):
                         st.success(f"Updated decision to '{new_decision}'")
 
     def _manage_goals(self):
-        goals = st.session_state.goals_df['goal'].tolist()
+        goals = self.pipeline_service.get_names('goals_df')
         if goals:
-            selected_goal = st.selectbox("Select Goal to Manage", goals, key="manage_goal")
+            selected_goal = st.selectbox(
+                "Select Goal to Manage", list(goals), format_func=goals.get, key="manage_goal"
+            )
             
             col1, col2 = st.columns(2)
             with col1:
                 if st.button("Delete Goal", key="delete_goal"):
                     if self.pipeline_service.delete_goal(selected_goal):
-                        st.success(f"Deleted goal '{selected_goal}' and all related items")
+                        st.success(f"Deleted goal '{goals[selected_goal]}' and all related items")
             
             with col2:
-                goal_data = st.session_state.goals_df[
-                    st.session_state.goals_df['goal'] == selected_goal
-                ].iloc[0]
+                goal_data = self.pipeline_service.get_item('goals_df', selected_goal)
                 
-                new_goal = st.text_input("New Goal Text", value=selected_goal, key="edit_goal")
+                new_goal = st.text_input("New Goal Text", value=goal_data['goal'], key="edit_goal")
                 
                 # Check if there are any decisions before creating the selectbox
-                if not st.session_state.decisions_df.empty:
-                    decisions_list = st.session_state.decisions_df['decision'].tolist()
-                    related_decision = goal_data.get('related_decision')
-                    if related_decision in decisions_list:
-                        decision_index = decisions_list.index(related_decision)
+                decisions = self.pipeline_service.get_names('decisions_df')
+                if decisions:
+                    decision_ids = list(decisions)
+                    related_decision = goal_data.get('decision_id')
+                    if related_decision in decisions:
+                        decision_index = decision_ids.index(related_decision)
                     else:
                         decision_index = 0
                         
                     new_decision = st.selectbox(
                         "Related Decision",
-                        decisions_list,
+                        decision_ids,
+                        format_func=decisions.get,
                         index=decision_index
                     )
                 else:
                     st.warning("No decisions available. Please add decisions first.")
                     new_decision = None
                 
-                if st.button("Update Goal", key="update_goal") and new_decision:
+                if st.button("Update Goal", key="update_goal") and new_decision is not None:
                     if self.pipeline_service.update_goal(selected_goal, new_goal, new_decision):
                         st.success(f"Updated goal to '{new_goal}'")
 
     def _manage_tasks(self):
-        tasks = st.session_state.tasks_df['task'].tolist()
+        tasks = self.pipeline_service.get_names('tasks_df')
         if tasks:
-            selected_task = st.selectbox("Select Task to Manage", tasks, key="manage_task")
+            selected_task = st.selectbox(
+                "Select Task to Manage", list(tasks), format_func=tasks.get, key="manage_task"
+            )
             
             col1, col2 = st.columns(2)
             with col1:
                 if st.button("Delete Task", key="delete_task"):
                     if self.pipeline_service.delete_task(selected_task):
-                        st.success(f"Deleted task '{selected_task}'")
+                        st.success(f"Deleted task '{tasks[selected_task]}'")
             
             with col2:
-                task_data = st.session_state.tasks_df[
-                    st.session_state.tasks_df['task'] == selected_task
-                ].iloc[0]
+                task_data = self.pipeline_service.get_item('tasks_df', selected_task)
                 
-                new_task = st.text_input("New Task Text", value=selected_task, key="edit_task")
+                new_task = st.text_input("New Task Text", value=task_data['task'], key="edit_task")
                 new_assignee = st.text_input("New Assignee", value=task_data.get('assignee', ''), key="edit_assignee")
                 
                 # Check if there are any goals before creating the selectbox
-                if not st.session_state.goals_df.empty:
-                    goals_list = st.session_state.goals_df['goal'].tolist()
-                    related_goal = task_data.get('related_goal')
-                    if related_goal in goals_list:
-                        goal_index = goals_list.index(related_goal)
+                goals = self.pipeline_service.get_names('goals_df')
+                if goals:
+                    goal_ids = list(goals)
+                    related_goal = task_data.get('goal_id')
+                    if related_goal in goals:
+                        goal_index = goal_ids.index(related_goal)
                     else:
                         goal_index = 0
                         
                     new_goal = st.selectbox(
                         "Related Goal",
-                        goals_list,
+                        goal_ids,
+                        format_func=goals.get,
                         index=goal_index
                     )
                 else:
@@ -206,7 +211,7 @@ class EntryManager:
                     index=["Not Started", "In Progress", "Completed"].index(task_data.get('status', 'Not Started'))
                 )
                 
-                if st.button("Update Task", key="update_task") and new_goal:
+                if st.button("Update Task", key="update_task") and new_goal is not None:
                     new_task_data = {
                         'task': new_task,
                         'assignee': new_assignee,
@@ -218,21 +223,21 @@ class EntryManager:
 
     def _manage_todos(self):
         """Manage todo items"""
-        if 'todos_df' in st.session_state and not st.session_state.todos_df.empty:
-            todos = st.session_state.todos_df['title'].tolist()
-            selected_todo = st.selectbox("Select Todo to Manage", todos, key="manage_todo")
+        todos = self.pipeline_service.get_names('todos_df') if 'todos_df' in self.pipeline_service.store else {}
+        if todos:
+            selected_todo = st.selectbox(
+                "Select Todo to Manage", list(todos), format_func=todos.get, key="manage_todo"
+            )
             
             col1, col2 = st.columns(2)
             with col1:
                 if st.button("Delete Todo", key="delete_todo"):
                     if self.pipeline_service.delete_todo(selected_todo):
-                        st.success(f"Deleted todo '{selected_todo}'")
+                        st.success(f"Deleted todo '{todos[selected_todo]}'")
                         st.rerun()
             
             with col2:
-                todo_data = st.session_state.todos_df[
-                    st.session_state.todos_df['title'] == selected_todo
-                ].iloc[0]
+                todo_data = self.pipeline_service.get_item('todos_df', selected_todo)
                 
                 new_title = st.text_input("Title", value=todo_data['title'], key="edit_todo_title")
                 new_details = st.text_area("Details", value=todo_data['details'], key="edit_todo_details")
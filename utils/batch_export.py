@@ -0,0 +1,180 @@
+"""Render every decision graph in a workspace to SVG files.
+
+    python -m utils.batch_export reports/decisions
+    python -m utils.batch_export reports/decisions --source decision_pipeline.xlsx
+
+Without --source the workspace is recovered from the app's journal. Each
+decision becomes <output>/decision-<id>.svg; a manifest of content hashes
+lets later runs skip decisions whose graph has not changed.
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import networkx as nx
+from services.graph_service import GraphService
+from services.mutation_journal import MutationJournal
+from services.pipeline_service import PipelineService
+from services.storage_service import StorageService
+from services.workspace_store import InMemoryStore
+from utils.visualization import PipelineVisualizer
+
+class BatchSvgExporter:
+    """Export the SVG diagram of every decision, in parallel and incrementally.
+
+    Each decision graph is taken from GraphService under the store's read
+    lock and flattened to plain node and edge lists, which are hashed
+    together with RENDER_VERSION and shipped to a process pool; workers lay
+    them out with PipelineVisualizer._calculate_positions and write the SVG
+    themselves. A decision is skipped when its hash matches the manifest
+    from the last run and its file still exists (unless forced), and files
+    of deleted decisions are removed.
+    """
+
+    MANIFEST_FILE = 'manifest.json'
+    # Bump when the SVG output changes, so files from older renderers are redrawn
+    RENDER_VERSION = 2
+
+    def __init__(self, pipeline_service, graph_service, workers=None):
+        self.pipeline_service = pipeline_service
+        self.graph_service = graph_service
+        self.workers = workers or os.cpu_count() or 1
+
+    def export(self, directory, force=False):
+        """Write the changed decision SVGs to directory and return run statistics"""
+        started = time.perf_counter()
+        os.makedirs(directory, exist_ok=True)
+        # Read the old manifest even when forced: it lists the files to sweep
+        manifest = self._read_manifest(directory)
+
+        jobs, hashes = [], {}
+        self.graph_service.portfolio_graph()
+        store = self.pipeline_service.store
+        with store.reading():
+            for decision_id in self.pipeline_service.get_names('decisions_df'):
+                G = self.graph_service.decision_graph_view(decision_id)
+                if G is None:
+                    continue
+                # View order depends on string hashing, which differs per process;
+                # sort so both the hash and the layout are stable across runs
+                nodes = sorted(
+                    ((node, dict(attributes)) for node, attributes in G.nodes(data=True)),
+                    key=lambda item: (item[1]['node_type'], item[1]['id'])
+                )
+                edges = sorted(G.edges())
+                key = str(decision_id)
+                hashes[key] = self._content_hash(nodes, edges)
+                path = os.path.join(directory, f'decision-{decision_id}.svg')
+                if force or manifest.get(key) != hashes[key] or not os.path.exists(path):
+                    jobs.append((path, nodes, edges))
+
+        written = 0
+        if jobs:
+            if self.workers == 1 or len(jobs) == 1:
+                written = sum(map(_render, jobs))
+            else:
+                chunksize = max(1, len(jobs) // (self.workers * 4))
+                with ProcessPoolExecutor(self.workers) as pool:
+                    written = sum(pool.map(_render, jobs, chunksize=chunksize))
+
+        removed = 0
+        for key in manifest.keys() - hashes.keys():
+            path = os.path.join(directory, f'decision-{key}.svg')
+            if os.path.exists(path):
+                os.remove(path)
+                removed += 1
+        self._write_manifest(directory, hashes)
+
+        seconds = time.perf_counter() - started
+        return {
+            'decisions': len(hashes),
+            'rendered': len(jobs),
+            'skipped': len(hashes) - len(jobs),
+            'removed': removed,
+            'bytes': written,
+            'seconds': seconds,
+            'per_second': len(jobs) / seconds if seconds else 0.0
+        }
+
+    @classmethod
+    def _content_hash(cls, nodes, edges):
+        content = json.dumps([cls.RENDER_VERSION, nodes, edges], sort_keys=True, default=str)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def _read_manifest(self, directory):
+        try:
+            with open(os.path.join(directory, self.MANIFEST_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self, directory, hashes):
+        path = os.path.join(directory, self.MANIFEST_FILE)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(hashes, f)
+        os.replace(path + '.tmp', path)
+
+
+# One visualizer per worker process
+_visualizer = None
+
+def _render(job):
+    """Lay out and write one decision graph; return the size of the SVG in bytes"""
+    global _visualizer
+    if _visualizer is None:
+        _visualizer = PipelineVisualizer(None, None)
+    path, nodes, edges = job
+    G = nx.DiGraph()
+    G.add_nodes_from(nodes)
+    G.add_edges_from(edges)
+    svg = _visualizer._generate_visualization(G).encode('utf-8')
+    with open(path + '.tmp', 'wb') as f:
+        f.write(svg)
+    os.replace(path + '.tmp', path)
+    return len(svg)
+
+
+def load_workspace(source=None, file_format=None, journal_directory=None):
+    """Load a workspace from a saved file or directory, or recover it from the journal"""
+    store = InMemoryStore()
+    storage = StorageService()
+    if source is None:
+        journal = MutationJournal(journal_directory) if journal_directory else MutationJournal()
+        journal.recover(store)
+        journal.close()
+    else:
+        file_format = file_format or ('excel' if source.endswith('.xlsx') else 'parquet')
+        if file_format == 'excel':
+            storage.load_from_excel(store, source)
+        else:
+            storage.load_from_columnar(store, source, file_format)
+    storage.initialize_dataframes(store)
+    return store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render every decision graph to SVG files.")
+    parser.add_argument('output', help="directory to write decision-<id>.svg files to")
+    parser.add_argument('--source', help="saved workspace: an .xlsx file or a Parquet/Feather directory")
+    parser.add_argument('--format', choices=('excel', 'parquet', 'feather'), help="format of --source")
+    parser.add_argument('--journal', help="journal directory to recover from when --source is not given")
+    parser.add_argument('--workers', type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument('--force', action='store_true', help="re-render decisions even if unchanged")
+    args = parser.parse_args(argv)
+
+    store = load_workspace(args.source, args.format, args.journal)
+    pipeline_service = PipelineService(store)
+    # Every decision is visited once, so there is nothing worth caching
+    graph_service = GraphService(pipeline_service, max_cached=0)
+    stats = BatchSvgExporter(pipeline_service, graph_service, args.workers).export(args.output, args.force)
+    print(
+        f"Rendered {stats['rendered']} of {stats['decisions']} decisions "
+        f"({stats['skipped']} unchanged, {stats['removed']} removed) in {stats['seconds']:.2f}s: "
+        f"{stats['per_second']:.1f} graphs/s, {stats['bytes'] / 1e6:.1f} MB written"
+    )
+
+
+if __name__ == '__main__':
+    main()
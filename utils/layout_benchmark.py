@@ -0,0 +1,100 @@
+"""Compare the triangle and layered decision-graph layouts.
+
+    python -m utils.layout_benchmark
+    python -m utils.layout_benchmark --sizes 100 1000 5000
+
+For synthetic decisions of each size it reports layout time, overlapping
+node pairs and edge crossings (straight segments) for both layouts.
+"""
+import argparse
+import random
+import time
+import networkx as nx
+import numpy as np
+from utils.visualization import PipelineVisualizer
+
+def decision_graph(size, seed=0):
+    """A decision graph of about size nodes, shaped like GraphService's"""
+    rng = random.Random(seed)
+    G = nx.DiGraph()
+
+    def add(node_type, i):
+        node = f'{node_type}-{i}'
+        G.add_node(node, text=f'{node_type.capitalize()}:\n{node}', node_type=node_type, id=i)
+        return node
+
+    decision = add('decision', 0)
+    G.add_edge(decision, add('rationale', 0))
+    concerns = [add('concern', i) for i in range(max(1, size // 10))]
+    for i in range(max(1, size * 3 // 10)):
+        G.add_edge(rng.choice(concerns), add('question', i))
+        G.add_edge(f'question-{i}', decision)
+    goals = [add('goal', i) for i in range(max(1, size // 10))]
+    G.add_edges_from((decision, goal) for goal in goals)
+    for i in range(max(0, size - len(G))):
+        G.add_edge(rng.choice(goals), add('task', i))
+    return G
+
+
+def overlaps(pos, radius):
+    """Pairs of nodes whose circles intersect"""
+    points = np.array(list(pos.values()), dtype=float)
+    total = 0
+    for start in range(0, len(points), 512):
+        block = points[start:start + 512]
+        distance = np.hypot(*(block[:, None, :] - points[None, :, :]).transpose(2, 0, 1))
+        # Count each pair once: only partners after the block row
+        later = np.arange(len(points))[None, :] > np.arange(start, start + len(block))[:, None]
+        total += int(((distance < 2 * radius) & later).sum())
+    return total
+
+
+def crossings(G, pos):
+    """Pairs of straight edges that cross, not counting shared endpoints"""
+    edges = [(u, v) for u, v in G.edges() if u in pos and v in pos]
+    if len(edges) < 2:
+        return 0
+    nodes = {node: i for i, node in enumerate(pos)}
+    ends = np.array([(nodes[u], nodes[v]) for u, v in edges])
+    points = np.array(list(pos.values()), dtype=float)
+    p, q = points[ends[:, 0]], points[ends[:, 1]]
+
+    def orientation(a, b, c):
+        return np.sign((b[..., 0] - a[..., 0]) * (c[..., 1] - a[..., 1]) - (b[..., 1] - a[..., 1]) * (c[..., 0] - a[..., 0]))
+
+    total = 0
+    for start in range(0, len(edges), 512):
+        stop = min(start + 512, len(edges))
+        a, b = p[start:stop, None], q[start:stop, None]
+        c, d = p[None, :], q[None, :]
+        proper = (orientation(a, b, c) * orientation(a, b, d) < 0) & (orientation(c, d, a) * orientation(c, d, b) < 0)
+        shared = (ends[start:stop, None, :, None] == ends[None, :, None, :]).any(axis=(2, 3))
+        later = np.arange(len(edges))[None, :] > np.arange(start, stop)[:, None]
+        total += int((proper & ~shared & later).sum())
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the decision-graph layouts.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[30, 100, 300, 1000, 3000])
+    parser.add_argument('--repeat', type=int, default=3, help="timing runs per layout, best is reported")
+    args = parser.parse_args(argv)
+
+    print(f"{'nodes':>6} {'layout':>9} {'ms':>9} {'overlaps':>9} {'crossings':>10}")
+    for size in args.sizes:
+        G = decision_graph(size)
+        for layout in ('triangle', 'layered'):
+            visualizer = PipelineVisualizer(None, None, layout=layout)
+            best = float('inf')
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                pos = visualizer._calculate_positions(G)
+                best = min(best, time.perf_counter() - started)
+            print(
+                f"{len(G):>6} {layout:>9} {best * 1000:>9.1f} "
+                f"{overlaps(pos, visualizer.node_radius):>9} {crossings(G, pos):>10}"
+            )
+
+
+if __name__ == '__main__':
+    main()
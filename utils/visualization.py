@@ -1,6 +1,12 @@
 import streamlit as st
+from collections import OrderedDict
 from io import StringIO
+import hashlib
+import html
 import math
+import threading
+import numpy as np
+from utils.layered_layout import LayeredLayout
 
 class BaseVisualizer:
     def __init__(self):
@@ -15,6 +21,13 @@ class BaseVisualizer:
         }
         
 class GraphVisualizer(BaseVisualizer):
+    # Layouts (positions and dimensions) by structural hash of the graph,
+    # shared by every instance since a visualizer is created per rerun.
+    # Labels do not affect the layout, so editing one only re-emits the SVG.
+    max_cached_layouts = 64
+    _layouts = OrderedDict()
+    _layouts_lock = threading.Lock()
+
     def __init__(self, pipeline_service=None, graph_service=None):
         super().__init__()
         self.pipeline_service = pipeline_service
@@ -27,40 +40,101 @@ class GraphVisualizer(BaseVisualizer):
         if not G:
             return None
 
-        pos = self._calculate_positions(G)
-        dimensions = self._calculate_graph_dimensions(G, pos)
+        pos, dimensions = self._layout(G)
         svg_content = self._generate_svg(G, pos, dimensions)
         return svg_content
 
+    def _layout(self, G):
+        """Get positions and dimensions for G, reusing those of a graph with the same structure"""
+        key = self._structure_hash(G)
+        with self._layouts_lock:
+            layout = self._layouts.get(key)
+            if layout is not None:
+                self._layouts.move_to_end(key)
+                return layout
+
+        pos = self._calculate_positions(G)
+        layout = (pos, self._calculate_graph_dimensions(G, pos))
+        with self._layouts_lock:
+            self._layouts[key] = layout
+            while len(self._layouts) > self.max_cached_layouts:
+                self._layouts.popitem(last=False)
+        return layout
+
+    def _structure_hash(self, G):
+        """Hash of G's node ids, node types and edges (not text), plus the layout settings"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(repr((type(self).__name__, getattr(self, 'layout', None), self.node_radius)).encode())
+        digest.update(repr(sorted(G.nodes(data='node_type'))).encode())
+        digest.update(repr(sorted(G.edges())).encode())
+        return digest.digest()
+
     def render(self):
         raise NotImplementedError("Subclasses must implement render method")
         
 class PipelineVisualizer(GraphVisualizer):
-    def __init__(self, pipeline_service, graph_service):
+    # Layouts: 'triangle' (decision at the apex, concerns along the base),
+    # 'layered' (LayeredLayout), or 'auto' for the triangle unless its nodes
+    # would overlap, as they do on decisions with many concerns or goals
+    LAYOUTS = ('auto', 'triangle', 'layered')
+
+    def __init__(self, pipeline_service, graph_service, layout='auto'):
         super().__init__(pipeline_service, graph_service)
+        if layout not in self.LAYOUTS:
+            raise ValueError(f"Unknown layout: {layout}")
+        self.layout = layout
 
     def render(self, selected_decision=None):
         """Render the pipeline visualization for a selected decision"""
         if selected_decision is None:
             return
             
-        graph = self.graph_service.generate_decision_graph(selected_decision)
-        svg_content = self._generate_visualization(graph)
+        # The graph is a view of the shared portfolio graph: bring that up to
+        # date first, then keep edits out while reading the view
+        self.graph_service.portfolio_graph()
+        with self.pipeline_service.store.reading():
+            graph = self.graph_service.decision_graph_view(selected_decision)
+            svg_content = self._generate_visualization(graph, inline=True)
         if svg_content:
             self._render_interactive_svg(svg_content)
         else:
             st.info("No relationships found for this decision.")
 
-    def _generate_visualization(self, G):
-        """Generate the complete visualization"""
+    def _generate_visualization(self, G, inline=False):
+        """Generate the complete visualization; inline=True for SVG embedded in an HTML page"""
         if not G:
             return None
 
-        pos = self._calculate_positions(G)
-        dimensions = self._calculate_graph_dimensions(G, pos)
-        return self._generate_svg(G, pos, dimensions)
+        pos, dimensions = self._layout(G)
+        return self._generate_svg(G, pos, dimensions, inline)
 
     def _calculate_positions(self, G):
+        """Calculate node positions with the configured layout"""
+        if self.layout != 'layered':
+            pos = self._calculate_triangle_positions(G)
+            if self.layout == 'triangle' or not self._has_overlaps(pos):
+                return pos
+        layout = LayeredLayout(
+            node_separation=self.node_radius * 2.5,
+            layer_separation=self.node_radius * 3
+        )
+        return layout.positions(G)
+
+    def _has_overlaps(self, pos):
+        """Check whether any two node circles intersect, bucketing positions into a grid"""
+        cell_size = self.node_radius * 2
+        grid = {}
+        for x, y in pos.values():
+            cell = (math.floor(x / cell_size), math.floor(y / cell_size))
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    for other_x, other_y in grid.get((cell[0] + dx, cell[1] + dy), ()):
+                        if math.hypot(x - other_x, y - other_y) < cell_size:
+                            return True
+            grid.setdefault(cell, []).append((x, y))
+        return False
+
+    def _calculate_triangle_positions(self, G):
         """Calculate node positions for triangular layout"""
         pos = {}
         
@@ -73,13 +147,15 @@ class PipelineVisualizer(GraphVisualizer):
         vertical_spacing = self.node_radius * 2.5  # Space between decision and rationale
         horizontal_spacing = self.node_radius * 4  # Increased from 3 for broader layout
         
-        # Find nodes of each type
-        decisions = [n for n in G.nodes() if G.nodes[n]['node_type'] == 'decision']
-        questions = [n for n in G.nodes() if G.nodes[n]['node_type'] == 'question']
-        concerns = [n for n in G.nodes() if G.nodes[n]['node_type'] == 'concern']
-        goals = [n for n in G.nodes() if G.nodes[n]['node_type'] == 'goal']
-        tasks = [t for t in G.nodes() if G.nodes[t]['node_type'] == 'task']
-        rationales = [n for n in G.nodes() if G.nodes[n]['node_type'] == 'rationale']
+        # Bucket nodes by type in one pass, keeping graph order within each type
+        nodes_by_type = {node_type: [] for node_type in self.colors}
+        for node, node_type in G.nodes(data='node_type'):
+            nodes_by_type[node_type].append(node)
+        decisions = nodes_by_type['decision']
+        questions = nodes_by_type['question']
+        goals = nodes_by_type['goal']
+        tasks = nodes_by_type['task']
+        rationales = nodes_by_type['rationale']
         
         # Define key points
         apex_y = margin
@@ -94,18 +170,24 @@ class PipelineVisualizer(GraphVisualizer):
         # Position rationale below decision
         pos[rationales[0]] = (decision_x, decision_y + vertical_spacing)
         
-        # Group questions by their related concern
+        # Group questions by their related concern, found among their predecessors
         question_groups = {}
         for question in questions:
-            concern = None
-            for edge in G.edges():
-                if edge[1] == question and G.nodes[edge[0]]['node_type'] == 'concern':
-                    concern = edge[0]
-                    break
+            concern = next(
+                (parent for parent in G.predecessors(question) if G.nodes[parent]['node_type'] == 'concern'),
+                None
+            )
             if concern not in question_groups:
                 question_groups[concern] = []
             question_groups[concern].append(question)
         
+        # Group tasks by goal in one pass, keeping graph order within each goal
+        goal_tasks = {goal: [] for goal in goals}
+        for task in tasks:
+            for goal in G.predecessors(task):
+                if goal in goal_tasks:
+                    goal_tasks[goal].append(task)
+
         # Calculate total width needed for concerns and their questions
         total_width = len(question_groups) * horizontal_spacing * 1.5  # Increased spacing multiplier
         start_x = center_x - (total_width / 2)
@@ -136,7 +218,7 @@ class PipelineVisualizer(GraphVisualizer):
                 
                 # Position related tasks with more spacing
                 task_y = goal_y + vertical_spacing
-                related_tasks = [t for t in tasks if (goal, t) in G.edges()]
+                related_tasks = goal_tasks[goal]
                 for j, task in enumerate(related_tasks):
                     pos[task] = (goal_start_x + (i * goal_spacing) + ((j - len(related_tasks)/2) * horizontal_spacing/1.5),
                                 task_y)
@@ -159,44 +241,45 @@ class PipelineVisualizer(GraphVisualizer):
             'view_box': f"{min_x-100} {min_y-100} {width+200} {height+200}"
         }
 
-    def _generate_svg(self, G, pos, dimensions):
+    def _generate_svg(self, G, pos, dimensions, inline=False):
         """Generate SVG content for the graph"""
         output = StringIO()
         
-        # SVG header
+        # SVG header with the shared stylesheet and node symbols
         output.write(self._get_svg_header(dimensions))
         
         # Draw edges
         self._draw_edges(G, pos, output)
         
         # Draw nodes
-        self._draw_nodes(G, pos, output)
+        self._draw_nodes(G, pos, output, inline)
         
-        # Add arrowhead definition and close SVG
+        # Close SVG
         output.write(self._get_svg_footer())
         
         return output.getvalue()
 
     def _get_svg_header(self, dimensions):
-        return f'''<svg xmlns="http://www.w3.org/2000/svg" 
-                    width="{dimensions['width']}" 
-                    height="{dimensions['height']}"
-                    viewBox="{dimensions['view_box']}"
-                    style="background-color: white;">
-                    <defs>
-                        <filter id="shadow" x="-20%" y="-20%" width="140%" height="140%">
-                            <feGaussianBlur in="SourceAlpha" stdDeviation="3"/>
-                            <feOffset dx="2" dy="2"/>
-                            <feComponentTransfer>
-                                <feFuncA type="linear" slope="0.3"/>
-                            </feComponentTransfer>
-                            <feMerge>
-                                <feMergeNode/>
-                                <feMergeNode in="SourceGraphic"/>
-                            </feMerge>
-                        </filter>
-                    </defs>
-                    <g class="zoom-pan-group">'''
+        # Styling lives in one stylesheet and each node type's circle in one
+        # <symbol>, so a node only carries its position, a <use> and its text
+        symbols = ''.join(
+            f'<symbol id="node-{node_type}" overflow="visible">'
+            f'<circle r="{self.node_radius}" fill="{color}" stroke="#666" stroke-width="0.5"/></symbol>'
+            for node_type, color in self.colors.items()
+        )
+        return f'''<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" width="{dimensions['width']}" height="{dimensions['height']}" viewBox="{dimensions['view_box']}" style="background-color: white;">
+<style>
+.edge {{ fill: none; stroke: gray; stroke-width: 2; marker-end: url(#arrowhead); }}
+.node {{ filter: url(#shadow); }}
+.node-text {{ font-family: Arial; font-size: 14px; padding: {self.text_padding}px; width: 100%; height: 100%; overflow: hidden; display: flex; align-items: center; justify-content: center; text-align: center; }}
+</style>
+<defs>
+<filter id="shadow" x="-20%" y="-20%" width="140%" height="140%"><feGaussianBlur in="SourceAlpha" stdDeviation="3"/><feOffset dx="2" dy="2"/><feComponentTransfer><feFuncA type="linear" slope="0.3"/></feComponentTransfer><feMerge><feMergeNode/><feMergeNode in="SourceGraphic"/></feMerge></filter>
+<marker id="arrowhead" viewBox="0 0 10 10" refX="20" refY="5" markerWidth="6" markerHeight="6" orient="auto"><path d="M 0 0 L 10 5 L 0 10 z" fill="gray"/></marker>
+{symbols}
+</defs>
+<g class="zoom-pan-group">
+'''
 
     def _draw_edges(self, G, pos, output):
         for edge in G.edges():
@@ -204,63 +287,45 @@ class PipelineVisualizer(GraphVisualizer):
             end = pos[edge[1]]
             ctrl_x = (start[0] + end[0]) / 2
             ctrl_y = (start[1] + end[1]) / 2 - 30
-            path = f"M {start[0]},{start[1]} Q {ctrl_x},{ctrl_y} {end[0]},{end[1]}"
-            output.write(f'''<path d="{path}" 
-                           stroke="gray" 
-                           stroke-width="2" 
-                           fill="none" 
-                           marker-end="url(#arrowhead)"/>''')
-
-    def _draw_nodes(self, G, pos, output):
+            n = self._number
+            output.write(
+                f'<path class="edge" d="M{n(start[0])},{n(start[1])} '
+                f'Q{n(ctrl_x)},{n(ctrl_y)} {n(end[0])},{n(end[1])}"/>\n'
+            )
+
+    def _draw_nodes(self, G, pos, output, inline=False):
+        text_width = self.node_radius * 1.8
         for node in G.nodes():
             node_type = G.nodes[node]['node_type']
             text = G.nodes[node]['text']
             x, y = pos[node]
             
-            output.write(f'''<g transform="translate({x},{y})" class="node" filter="url(#shadow)">
-                            <circle r="{self.node_radius}"
-                                   fill="{self.colors[node_type]}"
-                                   stroke="#666"
-                                   stroke-width="0.5"/>''')  # Reduced from 1
-            
-            text_width = self.node_radius * 1.8
-            output.write(self._get_node_text(text, text_width))
-            output.write('</g>')
-
-    def _get_node_text(self, text, text_width):
-        return f'''<foreignObject 
-                    x="{-text_width/2}" 
-                    y="{-self.node_radius}"
-                    width="{text_width}" 
-                    height="{self.node_radius * 2}">
-                    <div xmlns="http://www.w3.org/1999/xhtml"
-                         style="font-family: Arial; 
-                                font-size: 14px;
-                                padding: {self.text_padding}px;
-                                width: 100%;
-                                height: 100%;
-                                overflow: hidden;
-                                display: flex;
-                                align-items: center;
-                                justify-content: center;
-                                text-align: center;">
-                        {text}
-                    </div>
-                </foreignObject>'''
+            output.write(
+                f'<g class="node" transform="translate({self._number(x)},{self._number(y)})">'
+                f'<use href="#node-{node_type}" xlink:href="#node-{node_type}"/>'
+            )
+            output.write(self._get_node_text(text, text_width, inline))
+            output.write('</g>\n')
+
+    def _get_node_text(self, text, text_width, inline=False):
+        # An HTML parser puts foreignObject content in the XHTML namespace by
+        # itself, so only a standalone SVG file needs it spelled out per node
+        namespace = '' if inline else ' xmlns="http://www.w3.org/1999/xhtml"'
+        n = self._number
+        return (
+            f'<foreignObject x="{n(-text_width/2)}" y="{n(-self.node_radius)}" '
+            f'width="{n(text_width)}" height="{n(self.node_radius * 2)}">'
+            f'<div{namespace} class="node-text">{html.escape(text)}</div>'
+            f'</foreignObject>'
+        )
 
     def _get_svg_footer(self):
-        return '''<defs>
-                    <marker id="arrowhead" 
-                            viewBox="0 0 10 10" 
-                            refX="20" 
-                            refY="5"
-                            markerWidth="6" 
-                            markerHeight="6"
-                            orient="auto">
-                        <path d="M 0 0 L 10 5 L 0 10 z" fill="gray"/>
-                    </marker>
-                </defs>
-                </g></svg>'''
+        return '</g></svg>'
+
+    @staticmethod
+    def _number(value):
+        """Format a coordinate with at most one decimal and no trailing zeros"""
+        return f'{value:.1f}'.rstrip('0').rstrip('.')
 
     def _render_interactive_svg(self, svg_content):
         """Render SVG with interactive features"""
@@ -291,55 +356,29 @@ class PipelineVisualizer(GraphVisualizer):
                 </style>
                 <div style="position: relative;">
                     {svg_content}
+                    <div class="node-popup"></div>
                 </div>
                 <script>
                     {self._get_interactive_js()}
                     
-                    // Add popup functionality
+                    // One popup for all nodes, filled from the clicked node's own text
                     document.addEventListener('DOMContentLoaded', function() {{
-                        const nodes = document.querySelectorAll('.node');
-                        
-                        nodes.forEach((node, index) => {{
-                            // Create popup for each node
-                            const popup = document.createElement('div');
-                            popup.className = 'node-popup';
-                            popup.id = `node-popup-${{index}}`;
-                            
-                            // Get the text content from the node's foreignObject
-                            const text = node.querySelector('foreignObject div').textContent.trim();
-                            popup.textContent = text;
-                            
-                            // Add popup to the container
-                            node.parentElement.appendChild(popup);
-                            
-                            // Show popup on click
-                            node.addEventListener('click', function(e) {{
-                                e.stopPropagation();
-                                
-                                // Hide all popups first
-                                document.querySelectorAll('.node-popup').forEach(p => {{
-                                    p.style.display = 'none';
-                                }});
-                                
-                                // Show this popup
-                                popup.style.display = 'block';
-                                
-                                // Position popup near the click
-                                const rect = node.getBoundingClientRect();
-                                const containerRect = node.parentElement.getBoundingClientRect();
-                                
-                                popup.style.left = (e.clientX - containerRect.left + 10) + 'px';
-                                popup.style.top = (e.clientY - containerRect.top + 10) + 'px';
-                            }});
-                        }});
+                        const popup = document.querySelector('.node-popup');
+                        const container = popup.parentElement;
                         
-                        // Close popup when clicking outside
                         document.addEventListener('click', function(e) {{
-                            if (!e.target.closest('.node')) {{
-                                document.querySelectorAll('.node-popup').forEach(popup => {{
-                                    popup.style.display = 'none';
-                                }});
+                            const node = e.target.closest('.node');
+                            if (!node) {{
+                                popup.style.display = 'none';
+                                return;
                             }}
+                            popup.textContent = node.querySelector('.node-text').textContent.trim();
+                            popup.style.display = 'block';
+
+                            // Position popup near the click
+                            const containerRect = container.getBoundingClientRect();
+                            popup.style.left = (e.clientX - containerRect.left + 10) + 'px';
+                            popup.style.top = (e.clientY - containerRect.top + 10) + 'px';
                         }});
                     }});
                 </script>
@@ -482,39 +521,26 @@ class CircleVisualizer(BaseVisualizer):
                     }}
                 </style>
                 {svg_content}
+                <div class="circle-popup"></div>
                 <script>
-                    // Wait for the DOM to be fully loaded
+                    // One popup for all circles, filled from the clicked circle's own text
                     document.addEventListener('DOMContentLoaded', function() {{
-                        // Get all circle groups
-                        const circles = document.querySelectorAll('.circle-group');
-                        const popups = document.querySelectorAll('.circle-popup');
+                        const popup = document.querySelector('.circle-popup');
+                        const container = popup.parentElement;
                         
-                        // Add click handlers to all circles
-                        circles.forEach((circle, index) => {{
-                            circle.addEventListener('click', function(e) {{
-                                e.stopPropagation();
-                                
-                                // Hide all popups first
-                                popups.forEach(p => p.style.display = 'none');
-                                
-                                // Show clicked circle's popup
-                                const popup = document.getElementById(`popup-${{index}}`);
-                                if (popup) {{
-                                    popup.style.display = 'block';
-                                    
-                                    // Position popup near the click
-                                    const rect = circle.getBoundingClientRect();
-                                    popup.style.left = (e.clientX - rect.left + 10) + 'px';
-                                    popup.style.top = (e.clientY - rect.top + 10) + 'px';
-                                }}
-                            }});
-                        }});
-                        
-                        // Close popup when clicking outside
                         document.addEventListener('click', function(e) {{
-                            if (!e.target.closest('.circle-group')) {{
-                                popups.forEach(popup => popup.style.display = 'none');
+                            const circle = e.target.closest('.circle-group');
+                            if (!circle) {{
+                                popup.style.display = 'none';
+                                return;
                             }}
+                            popup.textContent = circle.querySelector('.circle-text').textContent.trim();
+                            popup.style.display = 'block';
+
+                            // Position popup near the click
+                            const containerRect = container.getBoundingClientRect();
+                            popup.style.left = (e.clientX - containerRect.left + 10) + 'px';
+                            popup.style.top = (e.clientY - containerRect.top + 10) + 'px';
                         }});
                     }});
                 </script>
@@ -528,95 +554,88 @@ class CircleVisualizer(BaseVisualizer):
         """Generate SVG content for the circle visualization with popup functionality"""
         output = []
         
-        output.append(f'''
-            <svg xmlns="http://www.w3.org/2000/svg" 
-                width="{width}" height="{height}"
-                viewBox="0 0 {width} {height}"
-                style="background-color: white;">
-            <defs>
-                <filter id="shadow" x="-20%" y="-20%" width="140%" height="140%">
-                    <feGaussianBlur in="SourceAlpha" stdDeviation="3"/>
-                    <feOffset dx="2" dy="2"/>
-                    <feComponentTransfer>
-                        <feFuncA type="linear" slope="0.3"/>
-                    </feComponentTransfer>
-                    <feMerge>
-                        <feMergeNode/>
-                        <feMergeNode in="SourceGraphic"/>
-                    </feMerge>
-                </filter>
-            </defs>
-        ''')
-
-        # Calculate positions
-        positions = self._calculate_packed_positions(items, width, height)
-
-        # Draw circles with truncated text and popup functionality
-        for i, (item, pos) in enumerate(zip(items, positions)):
-            radius = self.base_radius * (item['urgency'] / 50)
+        # Calculate positions; the view box grows to fit every circle
+        radii = self.base_radius * np.array([item['urgency'] for item in items], dtype=float) / 50
+        positions, (view_x, view_y, view_width, view_height) = self._calculate_packed_positions(radii, width, height)
+
+        # Styling lives in one stylesheet; each item only carries its position,
+        # radius, font size and text. The popup is a single element outside
+        # the SVG (see create_circle_graph). The SVG is only ever embedded in
+        # HTML, whose parser supplies the XHTML namespace of the labels.
+        output.append(f'''<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="{view_x:.1f} {view_y:.1f} {view_width:.1f} {view_height:.1f}" style="background-color: white;">
+<style>
+.circle-group {{ filter: url(#shadow); }}
+.circle-group circle {{ fill: {self.colors[item_type]}; stroke: #666; stroke-width: .5; }}
+.circle-label {{ width: 100%; height: 100%; display: flex; align-items: center; justify-content: center; text-align: center; font-family: Arial; padding: 5px; }}
+</style>
+<defs>
+<filter id="shadow" x="-20%" y="-20%" width="140%" height="140%"><feGaussianBlur in="SourceAlpha" stdDeviation="3"/><feOffset dx="2" dy="2"/><feComponentTransfer><feFuncA type="linear" slope="0.3"/></feComponentTransfer><feMerge><feMergeNode/><feMergeNode in="SourceGraphic"/></feMerge></filter>
+</defs>''')
+
+        # Draw circles with truncated text
+        for item, radius, pos in zip(items, radii.tolist(), positions.tolist()):
             x, y = pos
-            
-            # Create circle with truncated text
-            output.append(f'''
-                <g transform="translate({x},{y})" class="circle-group" filter="url(#shadow)">
-                    <circle r="{radius}"
-                           fill="{self.colors[item_type]}"
-                           stroke="#666"
-                           stroke-width=".5"/>
-                    <foreignObject x="{-radius}" y="{-radius}"
-                                 width="{radius*2}" height="{radius*2}">
-                        <div xmlns="http://www.w3.org/1999/xhtml"
-                             style="width: 100%;
-                                    height: 100%;
-                                    display: flex;
-                                    align-items: center;
-                                    justify-content: center;
-                                    text-align: center;
-                                    font-family: Arial;
-                                    font-size: {max(12, radius/4)}px;
-                                    padding: 5px;">
-                            <div class="circle-text">
-                                {item[item_type]}
-                            </div>
-                        </div>
-                    </foreignObject>
-                </g>
-                
-                <foreignObject x="0" y="0" width="{width}" height="{height}">
-                    <div xmlns="http://www.w3.org/1999/xhtml">
-                        <div id="popup-{i}" class="circle-popup">
-                            {item[item_type]}
-                        </div>
-                    </div>
-                </foreignObject>
-            ''')
+            output.append(
+                f'<g class="circle-group" transform="translate({x:.1f},{y:.1f})">'
+                f'<circle r="{radius:.1f}"/>'
+                f'<foreignObject x="{-radius:.1f}" y="{-radius:.1f}" width="{radius*2:.1f}" height="{radius*2:.1f}">'
+                f'<div class="circle-label" style="font-size: {max(12, radius/4):.0f}px;">'
+                f'<div class="circle-text">{html.escape(str(item[item_type]))}</div></div>'
+                f'</foreignObject></g>'
+            )
 
         output.append('</svg>')
         return '\n'.join(output)
 
-    def _calculate_packed_positions(self, items, width, height):
-        """Calculate positions for circles in a packed layout"""
-        positions = []
-        center_x = width / 2
-        center_y = height / 2
-        
-        if len(items) == 1:
-            positions.append((center_x, center_y))
-        elif len(items) <= 3:
-            angle_step = 2 * math.pi / len(items)
-            radius = min(width, height) / 4
-            for i in range(len(items)):
-                angle = i * angle_step
-                x = center_x + radius * math.cos(angle)
-                y = center_y + radius * math.sin(angle)
-                positions.append((x, y))
-        else:
-            angle_step = 2 * math.pi / len(items)
-            radius = min(width, height) / 3
-            for i in range(len(items)):
-                angle = i * angle_step
-                x = center_x + radius * math.cos(angle)
-                y = center_y + radius * math.sin(angle)
-                positions.append((x, y))
-            
-        return positions
+    def _calculate_packed_positions(self, radii, width, height):
+        """Pack circles of the given radii without overlaps, centred on a width x height canvas.
+
+        Circles are placed largest first on concentric rings around the
+        largest one. Each ring is one circle-width outside the previous one
+        (both rings' largest radii, which bound the rest since circles are
+        placed in size order), and within a ring neighbours are spaced by the
+        angle their chord needs, with the slack spread evenly; a ring takes as
+        many circles as fit around it. Each ring is computed with a few NumPy
+        operations, so thousands of circles pack in milliseconds.
+
+        Returns an (n, 2) array of positions and the view box (x, y, width,
+        height) covering the canvas and every circle, so a crowded chart is
+        scaled down to fit rather than clipped.
+        """
+        n = len(radii)
+        # Keep padding between neighbours by packing slightly larger circles
+        order = np.argsort(-radii, kind='stable')
+        sizes = radii[order] + self.padding / 2
+        packed = np.zeros((n, 2))
+
+        # ring_start is the first (largest) circle of the previous ring
+        ring_start, start, ring_radius = 0, 1, 0.0
+        while start < n:
+            ring_radius += sizes[ring_start] + sizes[start]
+            # No more than pi * ring_radius / smallest radius circles fit on the ring
+            candidates = sizes[start:min(n, start + int(math.pi * ring_radius / sizes[-1]) + 1)]
+            gaps = 2 * np.arcsin(np.minimum(1, (candidates[:-1] + candidates[1:]) / (2 * ring_radius)))
+            closing = 2 * np.arcsin(np.minimum(1, (candidates + candidates[0]) / (2 * ring_radius)))
+            # Angle used by the first k + 1 candidates, including the gap back to the first
+            used = np.concatenate([[0.0], np.cumsum(gaps)]) + closing
+            fits = used <= 2 * math.pi
+            count = len(candidates) if fits.all() else max(1, int(np.argmin(fits)))
+
+            angles = np.concatenate([[0.0], np.cumsum(gaps[:count - 1])])
+            angles += (2 * math.pi - used[count - 1]) / count * np.arange(count)
+            packed[start:start + count, 0] = ring_radius * np.cos(angles)
+            packed[start:start + count, 1] = ring_radius * np.sin(angles)
+            ring_start, start = start, start + count
+
+        positions = np.empty_like(packed)
+        positions[order] = packed + (width / 2, height / 2)
+
+        margin = self.padding
+        low = np.minimum((positions - radii[:, None]).min(axis=0) - margin, 0)
+        high = np.maximum((positions + radii[:, None]).max(axis=0) + margin, (width, height))
+        # Grow the smaller side so the chart keeps the canvas aspect ratio
+        view_width, view_height = high - low
+        scale = max(view_width / width, view_height / height)
+        extra_x, extra_y = width * scale - view_width, height * scale - view_height
+        view_box = (low[0] - extra_x / 2, low[1] - extra_y / 2, width * scale, height * scale)
+        return positions, tuple(float(value) for value in view_box)